@@ -1,5 +1,11 @@
+import bisect
+import multiprocessing
+import os
+import re
+
 import Bio
 import dnachisel
+import numpy as np
 
 
 class Methylase:
@@ -39,6 +45,20 @@ class Methylase:
         "X": "X",
         "N": "N",
     }
+    _letters = "".join(complement_table.keys())
+    _complements = "".join(complement_table.values())
+    # Translation tables of both cases, for str.translate() and bytes.translate():
+    complement_str_table = str.maketrans(
+        _letters + _letters.lower(), _complements + _complements.lower()
+    )
+    complement_bytes_table = bytes.maketrans(
+        (_letters + _letters.lower()).encode("ascii"),
+        (_complements + _complements.lower()).encode("ascii"),
+    )
+    # uint8 array (256) of the complement of each ASCII code:
+    complement_codes = np.frombuffer(
+        bytes(range(256)).translate(complement_bytes_table), dtype=np.uint8
+    )
 
     @staticmethod
     def reverse(sequence):
@@ -47,22 +67,92 @@ class Methylase:
 
     @staticmethod
     def complement(sequence):
-        complement_letters = [Methylase.complement_table[letter] for letter in sequence]
-        complement = "".join(complement_letters)
-        return complement
+        """Complement a str (or bytes). Letters not in complement_table are kept.
+
+        Other sequences (e.g. a Bio Seq, or a list of letters) are complemented as
+        a str.
+        """
+        if isinstance(sequence, bytes):
+            return sequence.translate(Methylase.complement_bytes_table)
+        if isinstance(sequence, (list, tuple)):
+            sequence = "".join(sequence)
+        elif not isinstance(sequence, str):
+            sequence = str(sequence)
+        return sequence.translate(Methylase.complement_str_table)
 
     @staticmethod
     def reverse_complement(sequence):
+        if hasattr(sequence, "reverse_complement"):  # EncodedSeq (or Bio Seq)
+            return sequence.reverse_complement()
         r = Methylase.reverse(sequence)
         rc = Methylase.complement(r)
         return rc
 
+    @staticmethod
+    def reverse_complement_batch(sequences):
+        """Reverse complement a list of str sequences, with one translate() call."""
+        if len(sequences) == 0:
+            return []
+        joined = "\n".join(sequences)
+        rc = Methylase.complement(joined[::-1])
+        return rc.split("\n")[::-1]
+
+    @staticmethod
+    def reverse_complement_array(codes):
+        """Reverse complement a NumPy array of ASCII codes (e.g. uint8)."""
+        return Methylase.complement_codes[codes[::-1]]
+
     def __init__(self, name, sequence, index_pos, index_neg):
         self.name = name
         self.sequence = sequence
         self.rc = self.reverse_complement(sequence)
         self.index_pos = index_pos
         self.index_neg = index_neg
+        self._regexprs = None
+        self._patterns = None
+        registry[name] = self
+
+    @property
+    def regexprs(self):
+        """Regular expressions (str) of the sequence and its reverse complement."""
+        if self._regexprs is None:
+            self._regexprs = tuple(
+                dnachisel.DnaNotationPattern.dna_sequence_to_regexpr(sequence)
+                for sequence in [self.sequence, self.rc]
+            )
+        return self._regexprs
+
+    @property
+    def patterns(self):
+        """Compiled patterns of the sequence and its reverse complement.
+
+        The patterns are lookaheads, so that `finditer()` finds overlapping sites.
+        They are compiled on first use, then reused.
+        """
+        if self._patterns is None:
+            self._patterns = tuple(
+                re.compile("(?=%s)" % regexpr) for regexpr in self.regexprs
+            )
+        return self._patterns
+
+    def find_starts(self, sequence):
+        """Return the starts of the sites on each strand: `{"+": [...], "-": [...]}`."""
+        pattern, pattern_rc = self.patterns
+        return {
+            "+": [match.start() for match in pattern.finditer(sequence)],
+            "-": [match.start() for match in pattern_rc.finditer(sequence)],
+        }
+
+
+"""Methylases (and Dnd) by name. Each new instance is registered under its name."""
+registry = {}
+
+
+def get_methylase(name):
+    """Return the methylase (or Dnd) of the given name, from the registry."""
+    if name not in registry:
+        raise KeyError("Unknown methylase: %s" % name)
+    return registry[name]
 
 
 EcoKDam = Methylase("EcoKDam", "GATC", 1, 2)
@@ -79,6 +169,153 @@ methylases = [
 ]
 
 
+class MethylaseScanner:
+    """Class for finding the sites of several methylases in a sequence, in one pass.
+
+    The patterns of both strands of all methylases are compiled into one regular
+    expression, with a lookahead group for each pattern, so that all (overlapping)
+    matches are found in a single scan of the sequence.
+
+    Parameters
+    ----------
+
+    methylases
+      list of Methylase class instances
+    """
+
+    def __init__(self, methylases):
+        self.methylases = list(methylases)
+        self.group_names = {}  # group name: (methylase index, strand)
+        expressions = []
+        for i, methylase in enumerate(self.methylases):
+            for strand, expression in zip(["+", "-"], methylase.regexprs):
+                group_name = "m%d%s" % (i, "p" if strand == "+" else "n")
+                self.group_names[group_name] = (i, strand)
+                expressions.append((group_name, expression))
+        # The first lookahead restricts the matches to positions with at least one
+        # site, then each site is captured by its own optional group:
+        any_site = "(?=%s)" % "|".join(expression for _, expression in expressions)
+        groups = "".join(
+            "(?=(?P<%s>%s))?" % (group_name, expression)
+            for group_name, expression in expressions
+        )
+        self.regex = re.compile(any_site + groups)
+
+    def scan(self, sequence, windows=None):
+        """Return the start positions of the matches of each methylase and strand.
+
+        The result is a dict `{methylase.name: {"+": [starts], "-": [starts]}}`,
+        with the starts in increasing order.
+
+        Parameters
+        ----------
+
+        sequence
+          string of ATGC characters
+
+        windows
+          Optional list of (start, end) of the parts of the sequence to scan
+          (default: whole sequence). Only matches entirely within a window are found.
+        """
+        if windows is None:
+            windows = [(0, len(sequence))]
+        hits = {methylase.name: {"+": [], "-": []} for methylase in self.methylases}
+        names = [methylase.name for methylase in self.methylases]
+        for window_start, window_end in merge_windows(windows):
+            window = sequence[window_start:window_end]
+            for match in self.regex.finditer(window):
+                start = window_start + match.start()
+                for group_name, group in match.groupdict().items():
+                    if group is not None:
+                        i, strand = self.group_names[group_name]
+                        hits[names[i]][strand].append(start)
+        return hits
+
+
+def merge_windows(windows):
+    """Return a sorted list of (start, end), merging overlapping windows."""
+    merged = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+_scanners = {}
+
+
+def get_scanner(methylases):
+    """Return a MethylaseScanner for the methylases, compiled once per process."""
+    key = tuple((methylase.name, methylase.sequence) for methylase in methylases)
+    if key not in _scanners:
+        _scanners[key] = MethylaseScanner(methylases)
+    return _scanners[key]
+
+
+_site_patterns = {}
+
+
+def get_site_patterns(site):
+    """Return the SequencePattern of a site and of its reverse complement (cached)."""
+    if site not in _site_patterns:
+        site_rc = Methylase.reverse_complement(site)
+        _site_patterns[site] = (
+            dnachisel.SequencePattern(site),
+            dnachisel.SequencePattern(site_rc),
+        )
+    return _site_patterns[site]
+
+
+def find_hits_in_region(starts, site_length, region):
+    """Return the starts (of the sorted starts) of sites lying within the region."""
+    first = bisect.bisect_left(starts, region.start)
+    last = bisect.bisect_right(starts, region.end - site_length)
+    return starts[first:last]
+
+
+class MethylationMatch:
+    """Match of a methylase site within an (extended) restriction site region.
+
+    Parameters
+    ----------
+
+    methylase
+      str name of the methylase
+
+    region
+      dnachisel.Location of the extended restriction site region
+
+    strand
+      1 (positive) or -1 (negative): the strand of the methylation site pattern
+
+    start
+      int start of the methylation site in the sequence
+
+    end
+      int end of the methylation site in the sequence
+    """
+
+    __slots__ = ["methylase", "region", "strand", "start", "end"]
+
+    def __init__(self, methylase, region, strand, start, end):
+        self.methylase = methylase
+        self.region = region
+        self.strand = strand
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return "MethylationMatch(%s, region=%s, strand=%d, location=%d-%d)" % (
+            self.methylase,
+            self.region,
+            self.strand,
+            self.start,
+            self.end,
+        )
+
+
 class Methylator:
     """Class for finding methylation sites within a pattern (site) in a sequence.
 
@@ -93,63 +330,179 @@ class Methylator:
 
     site
       string of ATGC characters (restriction enzyme recognition site)
+
+    topology
+      "linear" or "circular". For circular sequences, sites and regions spanning
+      the origin are found too. Their locations start before the end of the sequence
+      and end after it (e.g. 1995-2010 in a 2000 bp plasmid).
     """
 
-    def __init__(self, sequence, methylases, site):
+    def __init__(self, sequence, methylases, site, topology="linear"):
         """Initialize"""
         self.sequence = sequence
         self.methylases = methylases
         self.site = site
-
-        self.pattern = dnachisel.SequencePattern(site)
-        self.regions_seq = self.pattern.find_matches(self.sequence)
-
+        self.topology = topology
+
+        # Circular sequences are searched with the end before the start, and the start
+        # after the end, enough to extend any site by any methylase:
+        self.offset = 0
+        self.search_sequence = sequence
+        if topology == "circular" and len(sequence) > 0:
+            upstream, downstream = get_extension_lengths(methylases)
+            self.offset = upstream
+            self.search_sequence = make_circular_padding(
+                sequence, upstream, len(site) - 1 + downstream
+            )
+
+        self.pattern, self.pattern_rc = get_site_patterns(site)
         self.site_rc = Methylase.reverse_complement(site)
-        self.pattern_rc = dnachisel.SequencePattern(self.site_rc)
-        self.regions_rc = self.pattern_rc.find_matches(self.sequence)
-
+        # Regions in the searched sequence (used for the search):
+        regions_seq = self.pattern.find_matches(self.search_sequence)
+        regions_rc = self.pattern_rc.find_matches(self.search_sequence)
+        if topology == "circular":  # keep sites starting within the sequence
+            regions_seq, regions_rc = [
+                [
+                    region
+                    for region in regions
+                    if self.offset <= region.start < self.offset + len(sequence)
+                ]
+                for regions in (regions_seq, regions_rc)
+            ]
+        self._regions = regions_seq + regions_rc
+
+        # Regions in the sequence:
+        self.regions_seq = [self.to_sequence_region(r) for r in regions_seq]
+        self.regions_rc = [self.to_sequence_region(r) for r in regions_rc]
         self.regions = self.regions_seq + self.regions_rc
+        self._methylase_hits = None
 
-    def find_methylation_sites_in_pattern(self):
-        """Run find_one_methylation_site_in_pattern() for each enzyme in methylases"""
+    def to_sequence_location(self, start, end):
+        """Return (start, end) in the sequence, from the searched sequence.
 
-        print("Matches against methylase enzyme sites:")
-        print()
-        for methylase in self.methylases:
-            self.find_one_methylation_site_in_pattern(methylase)
+        In circular sequences, locations starting before the origin are moved by
+        the sequence length, so that they start before its end.
+        """
+        start, end = start - self.offset, end - self.offset
+        if start < 0:
+            start, end = start + len(self.sequence), end + len(self.sequence)
+        return start, end
+
+    def to_sequence_region(self, region):
+        """Return a dnachisel.Location of the searched sequence in the sequence."""
+        if self.offset == 0:
+            return region
+        start, end = self.to_sequence_location(region.start, region.end)
+        return dnachisel.Location(start, end, region.strand)
+
+    @property
+    def methylase_hits(self):
+        """Matches of all methylases around the restriction sites.
+
+        See MethylaseScanner.scan(). Only the extended restriction regions (of all
+        methylases) are scanned, in one pass.
+        """
+        if self._methylase_hits is None:
+            self._methylase_hits = self.scan_methylases(self.methylases)
+        return self._methylase_hits
+
+    def scan_methylases(self, methylases):
+        """Scan the extended restriction regions for the methylases' sites."""
+        # The widest extensions (as in extend_restriction_regions()) cover all:
+        upstream, downstream = get_extension_lengths(methylases)
+        windows = [
+            (max(0, region.start - upstream), region.end + downstream)
+            for region in self._regions
+        ]
+        return get_scanner(methylases).scan(self.search_sequence, windows=windows)
+
+    def find_methylation_sites_in_pattern(self, verbose=True):
+        """Run find_one_methylation_site_in_pattern() for each enzyme in methylases
+
+        Return a list of MethylationMatch of all methylases.
+
+        Parameters
+        ----------
+
+        verbose
+          If True, print the matches.
+        """
+        if verbose:
+            print("Matches against methylase enzyme sites:")
             print()
+        matches = []
+        for methylase in self.methylases:
+            matches += self.find_one_methylation_site_in_pattern(methylase, verbose)
+            if verbose:
+                print()
+        return matches
+
+    def find_one_methylation_site_in_pattern(self, methylase, verbose=True):
+        """Find overlapping methylation and restriction sites
+
+        Return a list of MethylationMatch, one for each methylation site within each
+        extended restriction region.
+
+        Parameters
+        ----------
+
+        methylase
+          Methylase class instance
 
-    def find_one_methylation_site_in_pattern(self, methylase):
-        """Find overlapping methylation and restriction sites"""
+        verbose
+          If True, print the matches (see print_methylation_matches()).
+        """
 
         extended_regions = self.extend_restriction_regions(methylase)
 
-        # For matching against positive strand of methylation pattern:
-        expression = dnachisel.DnaNotationPattern.dna_sequence_to_regexpr(
-            methylase.sequence
-        )
-        pattern = dnachisel.SequencePattern(expression)
+        if methylase.name in self.methylase_hits:
+            hits = self.methylase_hits[methylase.name]
+        else:  # methylase not in self.methylases
+            hits = self.scan_methylases([methylase])[methylase.name]
+        site_length = len(methylase.sequence)
 
-        # For matching against negative strand of methylation pattern:
-        expression_rc = dnachisel.DnaNotationPattern.dna_sequence_to_regexpr(
-            methylase.rc
+        matches = []
+        for region in extended_regions:
+            region_start, region_end = self.to_sequence_location(
+                region.start, region.end
+            )
+            region_location = dnachisel.Location(region_start, region_end, region.strand)
+            shift = region_start - region.start
+            for strand, strand_hits in [(1, hits["+"]), (-1, hits["-"])]:
+                for start in find_hits_in_region(strand_hits, site_length, region):
+                    matches.append(
+                        MethylationMatch(
+                            methylase.name,
+                            region_location,
+                            strand,
+                            start + shift,
+                            start + shift + site_length,
+                        )
+                    )
+
+        if verbose:
+            self.print_methylation_matches(methylase, extended_regions, matches)
+        return matches
+
+    def print_methylation_matches(self, methylase, extended_regions, matches):
+        """Print the matches of a methylase in each extended region."""
+        matched = set(
+            (match.region.start, match.region.end, match.strand) for match in matches
         )
-        pattern_rc = dnachisel.SequencePattern(expression_rc)
 
         print(methylase.name)
         print("=" * len(methylase.name))
 
         for region in extended_regions:
-            region_sequence = self.sequence[region.start : region.end]
-            print("Region:", region)
-            match_location = pattern.find_matches(region_sequence)
-            if len(match_location) != 0:
+            region_sequence = self.search_sequence[region.start : region.end]
+            start, end = self.to_sequence_location(region.start, region.end)
+            print("Region:", dnachisel.Location(start, end, region.strand))
+            if (start, end, 1) in matched:
                 print("Match in positive strand: %s" % region_sequence)
             else:
                 print("Positive strand: -")
 
-            match_location_rc = pattern_rc.find_matches(region_sequence)
-            if len(match_location_rc) != 0:
+            if (start, end, -1) in matched:
                 print("Match in negative strand: %s" % region_sequence)
             else:
                 print("Negative strand: -")
@@ -157,23 +510,245 @@ class Methylator:
 
     def extend_restriction_regions(self, methylase):
         """Modify list of dnachisel.Location of restriction sites to include
-        flanking nucleotides around restriction sites
+        flanking nucleotides around restriction sites (in `search_sequence`
+        coordinates, see `to_sequence_location()`)
         """
 
+        m = len(methylase.sequence) - (methylase.index_pos + 1)
         extended_regions = []
-        for region in self.regions:
-            region = region.extended(
-                methylase.index_neg, left=True, right=False
-            )  # extension upstream
-
-            m = len(methylase.sequence) - (methylase.index_pos + 1)
-            region = region.extended(
-                m, upper_limit=len(self.sequence), left=False, right=True
-            )  # extension downstream
+        for region in self._regions:
+            region = dnachisel.Location(
+                max(0, region.start - methylase.index_neg),  # extension upstream
+                min(len(self.search_sequence), region.end + m),  # extension downstream
+                region.strand,
+            )
             extended_regions.append(region)
         return extended_regions
 
 
+def get_extension_lengths(methylases):
+    """Return the longest (upstream, downstream) extensions of restriction regions.
+
+    See Methylator.extend_restriction_regions().
+    """
+    upstream = max(methylase.index_neg for methylase in methylases)
+    downstream = max(
+        len(methylase.sequence) - (methylase.index_pos + 1) for methylase in methylases
+    )
+    return upstream, downstream
+
+
+def make_circular_padding(sequence, left, right):
+    """Return the sequence with its last `left` letters prepended, and its first
+    `right` letters appended (repeating the sequence if needed)."""
+    repeats = (max(left, right) // len(sequence)) + 1
+    repeated = sequence * repeats
+    return repeated[len(repeated) - left :] + sequence + repeated[:right]
+
+
+def find_methylation_sites_in_chunks(
+    sequence, methylases, site, chunk_size=1000000, topology="linear"
+):
+    """Find methylation sites overlapping restriction sites, in chunks of a sequence.
+
+    Yield MethylationMatch, processing one chunk of the sequence at a time (with
+    an overlap that allows the extension of all sites), so that the memory used
+    does not depend on the length of the sequence. For circular sequences, the
+    sites near the origin are processed at the end, with the start and end of the
+    sequence joined.
+
+    Parameters
+    ----------
+
+    sequence
+      string of ATGC characters, or iterable of strings making up the sequence when
+      joined (e.g. the sequence lines of a large FASTA file), read lazily.
+
+    methylases
+      list of Methylase class instances
+
+    site
+      string of ATGC characters (restriction enzyme recognition site)
+
+    chunk_size
+      Number of positions (restriction site starts) processed at a time.
+
+    topology
+      "linear" or "circular" (see Methylator).
+    """
+    upstream, downstream = get_extension_lengths(methylases)
+    left = upstream  # letters needed before a site start
+    right = len(site) - 1 + downstream  # letters needed after a site start
+    junction_size = left + right + len(site)
+    if chunk_size <= junction_size:
+        raise ValueError("chunk_size must be larger than %d" % junction_size)
+    circular = topology == "circular"
+    if isinstance(sequence, str):
+        sequence = [sequence]
+
+    buffer = ""  # buffer[0] is at position buffer_start of the sequence
+    buffer_start = 0
+    position = 0  # start of the next chunk of site starts
+    head = ""  # start of the sequence, for circular sequences
+    for piece in sequence:
+        buffer += piece
+        if len(head) < junction_size:
+            head = (head + piece)[:junction_size]
+        while buffer_start + len(buffer) >= max(
+            position + chunk_size + right, 2 * junction_size if circular else 0
+        ):
+            window_start = max(0, position - left)
+            window = buffer[
+                window_start - buffer_start : position + chunk_size + right - buffer_start
+            ]
+            minimum = left if circular else 0  # circular: near origin processed last
+            yield from _find_matches_in_window(
+                window,
+                lambda i: window_start + i,
+                methylases,
+                site,
+                lambda start: max(position, minimum) <= start < position + chunk_size,
+            )
+            position += chunk_size
+            drop = min(position - left, buffer_start + len(buffer) - junction_size)
+            if drop > buffer_start:
+                buffer = buffer[drop - buffer_start :]
+                buffer_start = drop
+
+    length = buffer_start + len(buffer)
+    if length == 0:
+        return
+    if circular and length < 2 * junction_size:  # short: no chunk processed yet
+        methylator = Methylator(buffer, methylases, site, topology="circular")
+        yield from methylator.find_methylation_sites_in_pattern(verbose=False)
+        return
+
+    window_start = max(0, position - left)
+    maximum = length - right if circular else length
+    yield from _find_matches_in_window(
+        buffer[window_start - buffer_start :],
+        lambda i: window_start + i,
+        methylases,
+        site,
+        lambda start: max(position, left if circular else 0) <= start < maximum,
+    )
+    if circular:  # sites near the origin, in the end and start of the sequence joined
+        tail = buffer[len(buffer) - junction_size :]
+        yield from _find_matches_in_window(
+            tail + head,
+            lambda i: (length - junction_size + i) % length,
+            methylases,
+            site,
+            lambda start: start >= length - right or start < left,
+        )
+
+
+def _find_matches_in_window(window, to_position, methylases, site, keep_site):
+    """Return the matches in a window of a sequence, in sequence coordinates.
+
+    Only the restriction sites for which keep_site(start in the sequence) is True
+    are used. to_position(i) is the position in the sequence of window position i.
+    """
+    methylator = Methylator(window, methylases, site)
+    methylator._regions = [
+        region for region in methylator._regions if keep_site(to_position(region.start))
+    ]
+    matches = []
+    for match in methylator.find_methylation_sites_in_pattern(verbose=False):
+        region = match.region
+        region_start = to_position(region.start)
+        shift = region_start - region.start
+        match.region = dnachisel.Location(
+            region_start, region.end + shift, region.strand
+        )
+        match.start += shift
+        match.end += shift
+        matches.append(match)
+    return matches
+
+
+def screen_collection(records, sites, methylases, n_jobs=1, chunksize=16):
+    """Find methylation sites overlapping restriction sites in many sequences.
+
+    Return a table (list of dicts) with one row per match, with keys `record`,
+    `site`, `methylase`, `strand`, `region_start`, `region_end`, `start`, `end`
+    (see MethylationMatch).
+
+    Parameters
+    ----------
+
+    records
+      Iterable of Biopython SeqRecords, or of (name, sequence) pairs. It is read
+      lazily, e.g. `Bio.SeqIO.parse(path, "genbank")`. Sequences are uppercased.
+
+    sites
+      dict of restriction site name: site, or list of enzyme names (e.g.
+      `["BsaI", "BsmBI"]`, with sites from Biopython's `rest_dict`).
+
+    methylases
+      list of Methylase class instances
+
+    n_jobs
+      Number of processes (-1 or None: all CPUs).
+
+    chunksize
+      Number of records sent to a process at a time.
+    """
+    if not isinstance(sites, dict):
+        from Bio.Restriction.Restriction_Dictionary import rest_dict
+
+        sites = {name: rest_dict[name]["site"] for name in sites}
+    sequences = (
+        (record.id, str(record.seq)) if hasattr(record, "seq") else record
+        for record in records
+    )
+
+    if n_jobs is None or n_jobs < 0:
+        n_jobs = os.cpu_count()
+    if n_jobs == 1:
+        _init_screen_worker(sites, methylases)
+        return [row for rows in map(_screen_record, sequences) for row in rows]
+
+    # The sites and methylases are sent (and the scanner compiled) once per worker:
+    with multiprocessing.Pool(
+        n_jobs, initializer=_init_screen_worker, initargs=(sites, methylases)
+    ) as pool:
+        results = pool.imap(_screen_record, sequences, chunksize=chunksize)
+        return [row for rows in results for row in rows]
+
+
+_screen_worker_data = {}
+
+
+def _init_screen_worker(sites, methylases):
+    _screen_worker_data["sites"] = sites
+    _screen_worker_data["methylases"] = methylases
+    get_scanner(methylases)
+
+
+def _screen_record(name_and_sequence):
+    """Return the table rows of one sequence (see screen_collection())."""
+    name, sequence = name_and_sequence
+    sequence = sequence.upper()
+    rows = []
+    for site_name, site in _screen_worker_data["sites"].items():
+        methylator = Methylator(sequence, _screen_worker_data["methylases"], site)
+        for match in methylator.find_methylation_sites_in_pattern(verbose=False):
+            rows.append(
+                {
+                    "record": name,
+                    "site": site_name,
+                    "methylase": match.methylase,
+                    "strand": match.strand,
+                    "region_start": match.region.start,
+                    "region_end": match.region.end,
+                    "start": match.start,
+                    "end": match.end,
+                }
+            )
+    return rows
+
+
 class Dnd(Methylase):
     pass
 
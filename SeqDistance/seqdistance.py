@@ -1,7 +1,18 @@
 import os
 import csv
+import hashlib
+import itertools
+import multiprocessing
+import tempfile
 import numpy as np
 
+try:
+    from weighted_levenshtein import lev
+except ImportError:
+    _has_weighted_levenshtein = False
+else:
+    _has_weighted_levenshtein = True
+
 
 def make_dict_lowercase(dictionary):
     """Make dictionary lowercase"""
@@ -54,7 +65,49 @@ def make_letter_to_letter_matches(code_to_nt):
     return letter_to_letter_matches
 
 
-def hamming(seq, ref, substitute_costs=None, verbose=False):
+def encode_sequence(seq):
+    """Return a uint8 NumPy array of the ASCII codes of a sequence.
+
+    Parameters
+    ----------
+
+    seq
+      string, list of letters, Bio `Seq`, or an array of ASCII codes such as an
+      `EncodedSeq`.
+    """
+    if isinstance(seq, np.ndarray) or hasattr(seq, "__array__"):
+        return np.asarray(seq, dtype=np.uint8)
+    if isinstance(seq, (list, tuple)):
+        seq = "".join(seq)
+    return np.frombuffer(str(seq).encode("ascii"), dtype=np.uint8)
+
+
+def get_position_costs(seq, ref, substitute_costs=None):
+    """Return a numpy array of the substitution cost at each position.
+
+    Parameters
+    ----------
+
+    seq
+      string
+
+    ref
+      string of the same length as seq
+
+    substitute_costs
+      numpy array (128*128) of substitution costs. See `hamming()`.
+    """
+    if len(seq) != len(ref):
+        raise ValueError("seq and ref must have same length!")
+
+    if substitute_costs is None:
+        substitute_costs = np.ones((128, 128), dtype=np.float64)
+        np.fill_diagonal(substitute_costs, 0)  # self-matches
+
+    return substitute_costs[encode_sequence(seq), encode_sequence(ref)]
+
+
+def hamming(seq, ref, substitute_costs=None, verbose=False, max_distance=None):
     """Calculate Hamming distance
 
     Parameters
@@ -73,6 +126,53 @@ def hamming(seq, ref, substitute_costs=None, verbose=False):
     
     verbose
       If True, print alignment.
+
+    max_distance
+      If not None, stop as soon as the distance exceeds this value, and return inf.
+    """
+    if max_distance is not None and not verbose:
+        return bounded_hamming(seq, ref, max_distance, substitute_costs)
+
+    position_costs = get_position_costs(seq, ref, substitute_costs=substitute_costs)
+    # cumsum adds the costs left to right (as a plain loop would), so results with
+    # fractional costs are identical to summing position by position:
+    distance = position_costs.cumsum()[-1] if len(position_costs) else 0
+
+    if verbose:
+        alignment_mask = position_costs == 0
+        alignment = np.where(alignment_mask, ord("|"), ord(" ")).astype(np.uint8)
+        print(seq)
+        print(alignment.tobytes().decode("ascii"))
+        print(ref)
+
+    if max_distance is not None and distance > max_distance:
+        return np.inf
+    return distance
+
+
+def bounded_hamming(seq, ref, max_distance, substitute_costs=None, block_size=256):
+    """Calculate Hamming distance, or return inf if it is over max_distance.
+
+    The sequences are compared block by block, and the calculation stops at the
+    first block where the running distance exceeds max_distance.
+
+    Parameters
+    ----------
+
+    seq
+      string
+
+    ref
+      string
+
+    max_distance
+      Maximum distance.
+
+    substitute_costs
+      numpy array (128*128) of substitution costs. See `hamming()`.
+
+    block_size
+      Number of positions compared at once.
     """
     if len(seq) != len(ref):
         raise ValueError("seq and ref must have same length!")
@@ -81,23 +181,359 @@ def hamming(seq, ref, substitute_costs=None, verbose=False):
         substitute_costs = np.ones((128, 128), dtype=np.float64)
         np.fill_diagonal(substitute_costs, 0)  # self-matches
 
+    seq_codes = encode_sequence(seq)
+    ref_codes = encode_sequence(ref)
     distance = 0
-    for i, letter in enumerate(seq):
-        distance += substitute_costs[ord(letter), ord(ref[i])]
-
-    if verbose:
-        print(seq)
-        alignment = ""
-        for i, letter in enumerate(seq):
-            match = "|" if substitute_costs[ord(letter), ord(ref[i])] == 0 else " "
-            alignment += match
-        print(alignment)
-        print(ref)
+    for start in range(0, len(seq_codes), block_size):
+        end = start + block_size
+        block_costs = substitute_costs[seq_codes[start:end], ref_codes[start:end]]
+        block_costs[0] += distance  # continue the left-to-right sum of hamming()
+        distance = block_costs.cumsum()[-1]
+        if distance > max_distance:
+            return np.inf
 
     return distance
 
 
-def get_substitute_costs_from_csv(filepath, scale=True):
+def hamming_profile(seq, ref, substitute_costs=None, chunk_size=2 ** 20):
+    """Calculate Hamming distance between seq and each window of ref
+
+    Return a numpy array of distances, where element i is the distance between seq
+    and ref[i : i + len(seq)].
+
+    Parameters
+    ----------
+
+    seq
+      string (or `EncodedSeq`, Bio `Seq`), or a list (or tuple) of sequences of the
+      same length (scanned in one pass). In the latter case, a 2D array with one
+      row per sequence is returned.
+
+    ref
+      string, not shorter than seq
+
+    substitute_costs
+      numpy array (128*128) of substitution costs. See `hamming()`.
+
+    chunk_size
+      Maximum number of position costs looked up at once (limits memory use).
+    """
+    many_queries = isinstance(seq, (list, tuple))
+    queries = list(seq) if many_queries else [seq]
+    query_codes = np.array([encode_sequence(query) for query in queries], ndmin=2)
+    ref_codes = encode_sequence(ref)
+    len_seq = query_codes.shape[1]
+    if len(ref_codes) < len_seq:
+        raise ValueError("Reference is shorter than query!")
+
+    if substitute_costs is None:
+        substitute_costs = np.ones((128, 128), dtype=np.float64)
+        np.fill_diagonal(substitute_costs, 0)  # self-matches
+
+    if len_seq == 0:
+        profiles = np.zeros((len(queries), len(ref_codes) + 1))
+        return profiles if many_queries else profiles[0]
+
+    # Strided view of all windows of ref, without copying:
+    windows = np.lib.stride_tricks.sliding_window_view(ref_codes, len_seq)
+    n_windows = windows.shape[0]
+    profiles = np.empty((len(queries), n_windows), dtype=np.float64)
+    step = max(1, chunk_size // (len_seq * len(queries)))
+    for start in range(0, n_windows, step):
+        window_chunk = windows[start : start + step]
+        costs = substitute_costs[query_codes[:, None, :], window_chunk[None, :, :]]
+        # cumsum keeps the left-to-right summation order of hamming():
+        profiles[:, start : start + step] = costs.cumsum(axis=2)[:, :, -1]
+
+    return profiles if many_queries else profiles[0]
+
+
+def find_shortest_hamming(
+    seq, ref, substitute_costs=None, both_strands=False, max_distance=None
+):
+    """Calculate shortest Hamming distance between a sequence (seq) and 
+    subsets of another sequence (ref)
+
+    Return a dictionary with the shortest distance, the positions and sequences of
+    the best matching subsets of ref, and the distance profile of all positions.
+
+    Parameters
+    ----------
+
+    seq
+      string
+
+    ref
+      string, not shorter than seq
+
+    substitute_costs
+      numpy array (128*128) of substitution costs. See `hamming()`.
+
+    both_strands
+      If True, also scan the reverse complement of seq against ref, in the same pass
+      (requires EpiJinn). The matches are returned under `match_positions_rc`.
+
+    max_distance
+      If not None, and no position is within this distance, the returned distance
+      is inf and there are no match positions.
+    """
+    queries = [seq]
+    if both_strands:
+        try:
+            from Examples.EpiJinn import epijinn
+        except ImportError:
+            raise ImportError("Scanning both strands requires the EpiJinn module.")
+        queries.append(epijinn.Methylase.reverse_complement(seq))
+
+    profiles = hamming_profile(queries, ref, substitute_costs=substitute_costs)
+    shortest_distance = profiles.min()
+    if max_distance is not None and shortest_distance > max_distance:
+        shortest_distance = np.inf
+
+    hamming_result = {"Hamming distance": shortest_distance}
+    for profile, suffix in zip(profiles, ["", "_rc"]):
+        hamming_result["match_positions" + suffix] = {
+            start: ref[start : (start + len(seq))]
+            for start in np.flatnonzero(profile == shortest_distance).tolist()
+        }
+        hamming_result["profile" + suffix] = profile
+
+    return hamming_result
+
+
+def bounded_levenshtein(
+    seq,
+    ref,
+    max_distance,
+    insert_costs=None,
+    delete_costs=None,
+    substitute_costs=None,
+):
+    """Calculate weighted Levenshtein distance, or return inf if over max_distance.
+
+    Only the band of the dynamic programming matrix that can give a distance within
+    max_distance is calculated (Ukkonen's algorithm), and the calculation stops when
+    all values of a row exceed max_distance. The costs follow the conventions of
+    `weighted_levenshtein.lev()`, so that the results are the same.
+
+    Parameters
+    ----------
+
+    seq
+      string
+
+    ref
+      string
+
+    max_distance
+      Maximum distance.
+
+    insert_costs
+      numpy array (128) of costs of inserting letters of ref. Defaults to 1.
+
+    delete_costs
+      numpy array (128) of costs of deleting letters of seq. Defaults to 1.
+
+    substitute_costs
+      numpy array (128*128) of costs of substituting letters of seq (rows) with
+      letters of ref (columns). Identical letters always have 0 cost. Defaults to 1.
+    """
+    if insert_costs is None:
+        insert_costs = np.ones(128, dtype=np.float64)
+    if delete_costs is None:
+        delete_costs = np.ones(128, dtype=np.float64)
+    if substitute_costs is None:
+        substitute_costs = np.ones((128, 128), dtype=np.float64)
+
+    seq_codes = encode_sequence(seq).tolist()
+    ref_codes = encode_sequence(ref).tolist()
+    insert = insert_costs.tolist()
+    delete = delete_costs.tolist()
+    len_seq = len(seq_codes)
+    len_ref = len(ref_codes)
+
+    # Half-width of the band around the diagonal: paths leaving it need more indels
+    # than max_distance allows.
+    min_indel_cost = min(insert_costs.min(), delete_costs.min())
+    if min_indel_cost > 0:
+        band = int(max_distance // min_indel_cost)
+    else:
+        band = max(len_seq, len_ref)
+    if abs(len_seq - len_ref) > band:
+        return np.inf
+
+    inf = float("inf")
+    # Two rows of the matrix, reused: only the band (and the cells next to it, set
+    # to inf) are written, so each row costs O(band).
+    previous_row = [inf] * (len_ref + 1)  # row i - 1 of the matrix
+    row = [inf] * (len_ref + 1)
+    previous_row[0] = 0.0
+    for j in range(1, min(band, len_ref) + 1):
+        previous_row[j] = previous_row[j - 1] + insert[ref_codes[j - 1]]
+
+    letters_costs = {}
+    for i in range(1, len_seq + 1):
+        letter = seq_codes[i - 1]
+        if letter not in letters_costs:
+            letters_costs[letter] = substitute_costs[letter].tolist()
+        letter_costs = letters_costs[letter]
+        letter_delete = delete[letter]
+        start = max(1, i - band)
+        end = min(len_ref, i + band)
+        if start == 1:
+            row[0] = previous_row[0] + letter_delete
+        else:
+            row[start - 1] = inf  # left of the band
+        for j in range(start, end + 1):
+            ref_letter = ref_codes[j - 1]
+            if ref_letter == letter:  # as in lev(), matches always take the diagonal
+                row[j] = previous_row[j - 1]
+                continue
+            cost = previous_row[j - 1] + letter_costs[ref_letter]
+            deletion = previous_row[j] + letter_delete
+            if deletion < cost:
+                cost = deletion
+            insertion = row[j - 1] + insert[ref_letter]
+            if insertion < cost:
+                cost = insertion
+            row[j] = cost
+        if end < len_ref:
+            row[end + 1] = inf  # right of the band, read by the next row
+        if min(row[start - 1 : end + 1]) > max_distance:
+            return np.inf
+        previous_row, row = row, previous_row
+
+    distance = previous_row[len_ref]
+    return distance if distance <= max_distance else np.inf
+
+
+def pairwise_distances(
+    seqs, metric="hamming", substitute_costs=None, n_jobs=1, chunk_size=64
+):
+    """Calculate distances between all pairs of sequences
+
+    Return a condensed distance matrix: a numpy array of the distances of each pair
+    (i, j), where i < j, in the order (0, 1), (0, 2), ..., (1, 2), ... (the format
+    used by `scipy.spatial.distance.squareform`).
+
+    Parameters
+    ----------
+
+    seqs
+      list of strings. For the Hamming distance, these must have the same length.
+
+    metric
+      "hamming" or "levenshtein" (requires the weighted-levenshtein package).
+
+    substitute_costs
+      numpy array (128*128) of substitution costs. See `hamming()`.
+
+    n_jobs
+      Number of processes for the Levenshtein distances (-1 or None: all CPUs).
+      The Hamming distances are calculated with batched array operations.
+
+    chunk_size
+      Number of rows of the distance matrix per task (Levenshtein) or per array
+      operation (Hamming).
+    """
+    n_seqs = len(seqs)
+    distances = np.zeros(n_seqs * (n_seqs - 1) // 2, dtype=np.float64)
+    if n_seqs < 2:
+        return distances
+
+    if substitute_costs is None:
+        substitute_costs = np.ones((128, 128), dtype=np.float64)
+        np.fill_diagonal(substitute_costs, 0)  # self-matches
+
+    def fill_distances(row_chunks):
+        for start, end, chunk_distances in row_chunks:
+            distances[
+                _condensed_index(start, n_seqs) : _condensed_index(end, n_seqs)
+            ] = chunk_distances
+
+    if metric == "hamming":
+        fill_distances(_hamming_pairwise_rows(seqs, substitute_costs, chunk_size))
+    elif metric == "levenshtein":
+        if not _has_weighted_levenshtein:
+            raise ImportError("Levenshtein requires the weighted-levenshtein package.")
+        tasks = [
+            (start, min(start + chunk_size, n_seqs - 1))
+            for start in range(0, n_seqs - 1, chunk_size)
+        ]
+        if n_jobs is None or n_jobs < 0:
+            n_jobs = os.cpu_count()
+        if n_jobs == 1:
+            _init_pairwise_worker(seqs, substitute_costs)
+            fill_distances(map(_levenshtein_pairwise_rows, tasks))
+        else:
+            # The sequences and the cost table are sent once per worker, not per task:
+            with multiprocessing.Pool(
+                n_jobs,
+                initializer=_init_pairwise_worker,
+                initargs=(seqs, substitute_costs),
+            ) as pool:
+                fill_distances(pool.imap_unordered(_levenshtein_pairwise_rows, tasks))
+    else:
+        raise ValueError("metric must be 'hamming' or 'levenshtein'")
+
+    return distances
+
+
+def _condensed_index(row, n_seqs):
+    """Return the index of pair (row, row + 1) in a condensed distance matrix."""
+    return row * n_seqs - row * (row + 1) // 2
+
+
+def _hamming_pairwise_rows(seqs, substitute_costs, chunk_size):
+    """Yield (start, end, distances) for chunks of rows of the Hamming matrix.
+
+    Each sequence is one-hot encoded over the letters present (X), so that all
+    distances in a chunk of rows are one matrix product:
+    D[i, j] = sum over positions of X[i] @ costs @ X[j].T
+    """
+    if len(set(len(seq) for seq in seqs)) != 1:
+        raise ValueError("seqs must have same length for Hamming distance!")
+    codes = np.array([encode_sequence(seq) for seq in seqs], ndmin=2)
+    n_seqs, len_seq = codes.shape
+    letters, letter_indices = np.unique(codes, return_inverse=True)
+    letter_costs = substitute_costs[np.ix_(letters, letters)]
+
+    one_hot = np.zeros((n_seqs, len_seq, len(letters)), dtype=np.float64)
+    one_hot.reshape(-1, len(letters))[
+        np.arange(codes.size), letter_indices.reshape(-1)
+    ] = 1
+    weighted = (one_hot @ letter_costs).reshape(n_seqs, -1)
+    one_hot = one_hot.reshape(n_seqs, -1)
+
+    for start in range(0, n_seqs - 1, chunk_size):
+        end = min(start + chunk_size, n_seqs - 1)
+        block = weighted[start:end] @ one_hot.T
+        chunk_distances = [block[i - start, i + 1 :] for i in range(start, end)]
+        yield start, end, np.concatenate(chunk_distances)
+
+
+_pairwise_worker_data = {}
+
+
+def _init_pairwise_worker(seqs, substitute_costs):
+    _pairwise_worker_data["seqs"] = seqs
+    _pairwise_worker_data["substitute_costs"] = substitute_costs
+
+
+def _levenshtein_pairwise_rows(task):
+    """Return (start, end, distances) for rows start to end of the matrix."""
+    start, end = task
+    seqs = _pairwise_worker_data["seqs"]
+    substitute_costs = _pairwise_worker_data["substitute_costs"]
+    chunk_distances = [
+        lev(seqs[i], seqs[j], substitute_costs=substitute_costs)
+        for i in range(start, end)
+        for j in range(i + 1, len(seqs))
+    ]
+    return start, end, np.array(chunk_distances, dtype=np.float64)
+
+
+def get_substitute_costs_from_csv(filepath, scale=True, use_cache=True):
     """Make penalty table from csv file
     
     Parameters
@@ -115,7 +551,20 @@ def get_substitute_costs_from_csv(filepath, scale=True):
 
     scale
       If True, do max-min scaling to 0-1, so that highest score has 0 penalty value.
+
+    use_cache
+      If True, the table is cached on disk, keyed by a hash of the file contents.
+      See `get_cached_table()`.
     """
+    if use_cache:
+        with open(filepath, "rb") as f:
+            content = f.read()
+        return get_cached_table(
+            "csv_substitute_costs",
+            (content, scale),
+            lambda: get_substitute_costs_from_csv(filepath, scale, use_cache=False),
+        )
+
     with open(filepath) as f:
         ncols = len(f.readline().split(","))
     matrix = np.loadtxt(filepath, delimiter=",", usecols=range(1, ncols), skiprows=1)
@@ -124,7 +573,7 @@ def get_substitute_costs_from_csv(filepath, scale=True):
 
     if scale:
         matrix -= matrix.min()
-        matrix /= matrix.ptp()  # min-max normalization
+        matrix /= np.ptp(matrix)  # min-max normalization
         matrix = 1 - matrix  # reverse so that highest score has 0 penalty
 
     with open(filepath, newline="") as f:
@@ -141,6 +590,91 @@ def get_substitute_costs_from_csv(filepath, scale=True):
     return substitute_costs
 
 
+"""Version of the cached tables, part of their hash: increase it when a table is
+made differently (e.g. a change of make_penalty_table()), so that the tables
+cached before are not used."""
+cache_version = 1
+
+
+def get_cache_dir():
+    """Return the directory of cached substitution tables.
+
+    Set the SEQDISTANCE_CACHE_DIR environment variable to change the location.
+    """
+    default_dir = os.path.join(os.path.expanduser("~"), ".cache", "seqdistance")
+    return os.environ.get("SEQDISTANCE_CACHE_DIR", default_dir)
+
+
+def hash_inputs(inputs):
+    """Return a hex digest identifying the inputs of a table.
+
+    Parameters
+    ----------
+
+    inputs
+      Any combination of dicts, sets, lists, tuples, strings, bytes, numbers and
+      numpy arrays. Dicts and sets are hashed independently of their order.
+    """
+
+    def make_hashable(obj):
+        if isinstance(obj, dict):
+            return ("dict", sorted((repr(k), make_hashable(v)) for k, v in obj.items()))
+        if isinstance(obj, (set, frozenset)):
+            return ("set", sorted(repr(make_hashable(v)) for v in obj))
+        if isinstance(obj, (list, tuple)):
+            return ("list", [make_hashable(v) for v in obj])
+        if isinstance(obj, np.ndarray):
+            return ("ndarray", obj.dtype.str, obj.shape, obj.tobytes())
+        return obj
+
+    return hashlib.sha1(repr(make_hashable(inputs)).encode("utf8")).hexdigest()
+
+
+def get_cached_table(name, inputs, make_table, cache_dir=None):
+    """Return a table made by `make_table()`, cached on disk.
+
+    The table is saved as a .npy file named after `name` and the hash of `inputs`
+    (and of `cache_version`), so a change of inputs results in a new table. If the
+    cache directory is not writable, the table is returned without caching.
+
+    Parameters
+    ----------
+
+    name
+      str name of the table.
+
+    inputs
+      The data the table is made from (see `hash_inputs()`).
+
+    make_table
+      Function with no arguments that returns the numpy array.
+
+    cache_dir
+      Directory of the .npy files (default: `get_cache_dir()`).
+    """
+    if cache_dir is None:
+        cache_dir = get_cache_dir()
+    digest = hash_inputs((cache_version, name, inputs))
+    path = os.path.join(cache_dir, "%s_%s.npy" % (name, digest))
+
+    try:
+        return np.load(path)
+    except (OSError, ValueError, EOFError):  # not cached yet, or unreadable file
+        pass
+
+    table = make_table()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write then rename, so that concurrent processes never read partial files:
+        with tempfile.NamedTemporaryFile(dir=cache_dir, delete=False) as f:
+            np.save(f, table)
+        os.replace(f.name, path)
+    except OSError:
+        pass
+
+    return table
+
+
 def count_matches(seq_matches, ref_matches, substitute_costs):
     matches = 0
     for s in seq_matches:
@@ -269,6 +803,162 @@ def update_substitute_costs(substitute_costs, translation_table):
     return updated_substitute_costs
 
 
+class SequenceIndex:
+    """Index of sequences, for finding the ones within a distance of a query.
+
+    Queries use the pigeonhole principle: if a sequence is within k mismatches (or
+    edits) of the query, then at least one of k + 1 non-overlapping segments of the
+    query matches it exactly, at the same position (or shifted by at most k edits).
+    The first k-mer of each segment is looked up in the index, allowing for
+    ambiguous letters, and only the sequences found are compared to the query.
+    Queries that are too short to be split into segments of at least `kmer_size`
+    letters are compared to all sequences.
+
+    Parameters
+    ----------
+
+    seqs
+      list of strings to index.
+
+    metric
+      "hamming" (sequences of the query length, same positions) or "levenshtein".
+
+    kmer_size
+      int length of the indexed k-mers (seeds).
+
+    substitute_costs
+      numpy array (128*128) of substitution costs (default: `nt_substitute_costs`).
+      Letter pairs with 0 cost must match in `letter_to_letter_matches`.
+
+    letter_to_letter_matches
+      dict of uppercase letter: {matching uppercase letters}
+      (default: `letter_to_letter_matches_uppercase`).
+
+    max_expansions
+      Maximum number of unambiguous variants of a query k-mer. Queries with more
+      variants for any seed are compared to all sequences.
+    """
+
+    def __init__(
+        self,
+        seqs,
+        metric="hamming",
+        kmer_size=5,
+        substitute_costs=None,
+        letter_to_letter_matches=None,
+        max_expansions=1024,
+    ):
+        if metric not in ["hamming", "levenshtein"]:
+            raise ValueError("metric must be 'hamming' or 'levenshtein'")
+        if metric == "levenshtein" and not _has_weighted_levenshtein:
+            raise ImportError("Levenshtein requires the weighted-levenshtein package.")
+        if substitute_costs is None:
+            substitute_costs = _get_table("nt_substitute_costs")
+        if letter_to_letter_matches is None:
+            letter_to_letter_matches = letter_to_letter_matches_uppercase
+
+        self.seqs = list(seqs)
+        self.metric = metric
+        self.kmer_size = kmer_size
+        self.substitute_costs = substitute_costs
+        self.letter_to_letter_matches = letter_to_letter_matches
+        self.max_expansions = max_expansions
+        # Each mismatch (or edit) adds at least this much to the distance:
+        min_cost = substitute_costs[substitute_costs > 0].min()
+        self.min_edit_cost = min_cost if metric == "hamming" else min(min_cost, 1)
+
+        self.alphabet = set()
+        self.kmers = {}  # (position, kmer): set of indices
+        self.ids_by_length = {}
+        for i, seq in enumerate(self.seqs):
+            upper_seq = seq.upper()
+            self.alphabet.update(upper_seq)
+            self.ids_by_length.setdefault(len(seq), []).append(i)
+            for position in range(len(seq) - kmer_size + 1):
+                kmer = upper_seq[position : position + kmer_size]
+                self.kmers.setdefault((position, kmer), set()).add(i)
+
+    def query(self, seq, k):
+        """Return a list of (index, distance) of the sequences within distance k.
+
+        Parameters
+        ----------
+
+        seq
+          string
+
+        k
+          Maximum distance.
+        """
+        candidates = self.find_candidates(seq, k)
+        results = []
+        for i in sorted(candidates):
+            if self.metric == "hamming":
+                distance = bounded_hamming(
+                    seq, self.seqs[i], k, substitute_costs=self.substitute_costs
+                )
+            else:
+                distance = lev(
+                    seq, self.seqs[i], substitute_costs=self.substitute_costs
+                )
+            if distance <= k:
+                results.append((i, distance))
+
+        return results
+
+    def query_batch(self, seqs, k):
+        """Return a list of `query()` results, one for each sequence of seqs."""
+        return [self.query(seq, k) for seq in seqs]
+
+    def find_candidates(self, seq, k):
+        """Return the set of indices of sequences that may be within distance k."""
+        max_edits = int(k // self.min_edit_cost)
+        if self.metric == "hamming":
+            candidate_lengths = [len(seq)]
+        else:
+            candidate_lengths = [
+                length
+                for length in self.ids_by_length
+                if abs(length - len(seq)) <= max_edits
+            ]
+        all_ids = set()
+        for length in candidate_lengths:
+            all_ids.update(self.ids_by_length.get(length, []))
+
+        segment_length = len(seq) // (max_edits + 1)
+        if segment_length < self.kmer_size:
+            return all_ids
+
+        seeds = []
+        upper_seq = seq.upper()
+        for position in range(0, segment_length * (max_edits + 1), segment_length):
+            kmer_matches = [
+                self.letter_to_letter_matches.get(letter, {letter}) & self.alphabet
+                for letter in upper_seq[position : position + self.kmer_size]
+            ]
+            n_variants = np.prod([len(matches) for matches in kmer_matches])
+            if n_variants > self.max_expansions:
+                return all_ids
+            seeds.append((position, kmer_matches))
+
+        max_shift = 0 if self.metric == "hamming" else max_edits
+        candidates = set()
+        for position, kmer_matches in seeds:
+            for letters in itertools.product(*kmer_matches):
+                kmer = "".join(letters)
+                for shift in range(-max_shift, max_shift + 1):
+                    candidates.update(self.kmers.get((position + shift, kmer), ()))
+
+        return candidates & all_ids
+
+
+def _get_table(name):
+    """Return a module-level substitution table, making it if needed."""
+    if name in globals():
+        return globals()[name]
+    return __getattr__(name)
+
+
 """Extended nucleotide letter to nucleotide letter dictionary"""
 ambiguity_code_to_nt_set = {
     "A": {"A"},
@@ -326,9 +1016,22 @@ letter_to_letter_matches_uppercase = make_letter_to_letter_matches(
     ambiguity_code_to_nt_set
 )
 letter_to_letter_matches = make_dict_both_case(letter_to_letter_matches_uppercase)
-nt_substitute_costs = make_penalty_table(letter_to_letter_matches)
-aa_substitute_costs = make_penalty_table(allowed_aa_transitions)
 
-uncertainty_substitute_costs = get_uncertainty_costs(
-    ambiguity_code_to_nt_set, substitute_costs=None
-)
+
+def __getattr__(name):
+    """Make the substitution tables on first access (or load them from the cache)."""
+    if name == "nt_substitute_costs":
+        inputs = letter_to_letter_matches
+        make_table = lambda: make_penalty_table(letter_to_letter_matches)
+    elif name == "aa_substitute_costs":
+        inputs = allowed_aa_transitions
+        make_table = lambda: make_penalty_table(allowed_aa_transitions)
+    elif name == "uncertainty_substitute_costs":
+        inputs = ambiguity_code_to_nt_set
+        make_table = lambda: get_uncertainty_costs(ambiguity_code_to_nt_set)
+    else:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    table = get_cached_table(name, inputs, make_table)
+    globals()[name] = table  # next accesses don't call __getattr__()
+    return table
@@ -2,27 +2,6 @@ import seqdistance
 import genealloy
 from weighted_levenshtein import lev
 
-
-def find_shortest_hamming(seq, ref, substitute_costs):
-    """Calculate shortest Hamming distance between a sequence (seq) and 
-    subsets of another sequence (ref)"""
-    len_seq = len(seq)
-    len_ref = len(ref)
-    if len_ref < len_seq:
-        raise ValueError("Reference is shorter than query!")
-
-    hamming_result = {"Hamming distance": len_seq, "match_positions": dict()}
-    for start in range(0, len_ref - len_seq + 1):
-        ref_sub = ref[start : (start + len_seq)]
-        hamming = seqdistance.hamming(seq, ref_sub, substitute_costs=substitute_costs)
-        if hamming < hamming_result["Hamming distance"]:
-            hamming_result["Hamming distance"] = hamming
-            hamming_result["match_positions"] = {start: ref_sub}
-        elif hamming == hamming_result["Hamming distance"]:
-            hamming_result["match_positions"][start] = ref_sub
-    return hamming_result
-
-
 letter_to_letter_matches_uppercase = seqdistance.make_letter_to_letter_matches(
     genealloy.ambiguity_code_to_nt_set
 )
@@ -38,8 +17,29 @@ ref = "ggGGGCATGGATCGGCGAACGAGSCtgATAAGGTGCTAGCTAAAAAAAAAA"
 lev(seq, ref, substitute_costs=nt_substitute_costs)
 # 36.0
 # Hamming distance with positions and sequences:
-find_shortest_hamming(seq, ref, substitute_costs=nt_substitute_costs)
-# {'Hamming distance': 2.0, 'match_positions': {6: 'ATGGATCGGCGAACG'}}
+result = seqdistance.find_shortest_hamming(seq, ref, substitute_costs=nt_substitute_costs)
+result["Hamming distance"], result["match_positions"]
+# (2.0, {6: 'ATGGATCGGCGAACG'})
+# Distances for all positions:
+result["profile"]
+# array([11., 10.,  7., 12., 13., 12.,  2., 13., 12., 11., ...
+
+# Search both strands of ref in one pass:
+seq = "TCGTTCGCCGATCCAT"  # reverse complement of ref[6:22]
+result = seqdistance.find_shortest_hamming(
+    seq, ref, substitute_costs=nt_substitute_costs, both_strands=True
+)
+result["Hamming distance"], result["match_positions"], result["match_positions_rc"]
+# (0.0, {}, {6: 'ATGGATCGGCGAACGA'})
+
+# An EncodedSeq (or Bio Seq) is one query; a list or tuple holds several queries:
+from Examples.encodedseq import EncodedSeq
+
+seqdistance.hamming_profile(EncodedSeq("ACGT"), "AACGTT")
+# array([3., 0., 3.])
+seqdistance.hamming_profile(["ACGT", "TTTT"], "AACGTT")
+# array([[3., 0., 3.],
+#        [4., 3., 2.]])
 ########################################################################################
 
 # Calculate distance for complement sequences
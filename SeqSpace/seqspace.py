@@ -1,4 +1,20 @@
+import gzip
+import math
+import mmap
+import multiprocessing
+import os
+import re
+import struct
+
 import dnachisel
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    _has_zstandard = False
+else:
+    _has_zstandard = True
 
 
 class SeqSpace:
@@ -29,12 +45,74 @@ class SeqSpace:
     def get_string(self):
         choice_list = self.space.choices_list
 
-        sequence = ""
-        for choice in choice_list:
-            seqs = self.separator.join(choice.variants)
-            seqs += self.segment_separator
-            sequence += seqs
-        return sequence
+        return "".join(
+            self.separator.join(choice.variants) + self.segment_separator
+            for choice in choice_list
+        )
+
+    def size(self):
+        """Return the number of sequences of the space (int)."""
+        return math.prod(len(choice.variants) for choice in self.space.choices_list)
+
+    def iter_sequences(self, start=0):
+        """Iterate over the sequences of the space (str), lazily.
+
+        The sequences are in mixed-radix order: the choices of the last segment
+        change first (as in `itertools.product()`). Start at the sequence number
+        `start`, to resume an iteration.
+        """
+        variants = [list(choice.variants) for choice in self.space.choices_list]
+        if not 0 <= start < self.size():
+            return
+        digits = []
+        for segment_variants in reversed(variants):
+            start, digit = divmod(start, len(segment_variants))
+            digits.append(digit)
+        digits.reverse()
+        parts = [
+            segment_variants[digit]
+            for segment_variants, digit in zip(variants, digits)
+        ]
+        while True:
+            yield "".join(parts)
+            i = len(digits) - 1
+            while i >= 0 and digits[i] == len(variants[i]) - 1:
+                digits[i] = 0
+                parts[i] = variants[i][0]
+                i -= 1
+            if i < 0:
+                return
+            digits[i] += 1
+            parts[i] = variants[i][digits[i]]
+
+    def sample(self, n, seed=None, batch_size=10000):
+        """Draw n sequences (str) of the space, uniformly at random (with
+        replacement), lazily.
+
+        The choice of each segment is drawn with NumPy, for batches of sequences.
+        """
+        rng = np.random.default_rng(seed)
+        choices = self.space.choices_list
+        choice_codes = [
+            np.array(
+                [list(variant.encode("ascii")) for variant in choice.variants],
+                dtype=np.uint8,
+            ).reshape(len(choice.variants), choice.end - choice.start)
+            for choice in choices
+        ]
+        if any(len(codes) == 0 for codes in choice_codes):
+            raise ValueError("The space has a segment without choices")
+        offset = choices[0].start if len(choices) > 0 else 0
+        sequence_length = choices[-1].end - offset if len(choices) > 0 else 0
+        for batch_start in range(0, n, batch_size):
+            batch_length = min(batch_size, n - batch_start)
+            batch = np.empty((batch_length, sequence_length), dtype=np.uint8)
+            for choice, codes in zip(choices, choice_codes):
+                picks = rng.integers(0, len(codes), size=batch_length)
+                batch[:, choice.start - offset : choice.end - offset] = codes[picks]
+            data = batch.tobytes().decode("ascii")
+            for i in range(batch_length):
+                yield data[i * sequence_length : (i + 1) * sequence_length]
 
     def make_filetext(self):
         header = ">" + self.name + "\n"
@@ -49,6 +127,15 @@ class SeqSpace:
         f.write(filetext.encode("utf8"))
         f.close()
 
+    def write_binary_file(self, path=None, compression="gzip"):
+        """Write the SeqSpace in the binary .seqspacez format (see
+        `SeqSpaceZWriter`)."""
+        if path is None:
+            path = self.name + ".seqspacez"
+        with SeqSpaceZWriter(path, self.name, compression=compression) as writer:
+            for choice in self.space.choices_list:
+                writer.write_segment(choice.variants)
+
 
 def read_seqspace(path, separator=",", segment_separator="|"):
     """Read seqspace from file
@@ -104,6 +191,404 @@ def read_seqspace(path, separator=",", segment_separator="|"):
     return seq_space
 
 
+class SeqSpaceReader:
+    """Memory-mapped reader of a .seqspace file, with random access to segments.
+
+    The file is not loaded: an index of the segment offsets is made from the
+    mapped file, and the segments are read when requested. A DNA Chisel
+    MutationSpace is only made on demand, for a window or the whole space.
+
+    Parameters
+    ----------
+
+    path
+      str path to file written by `SeqSpace().write_file()`
+
+    separator
+      separator between segment choices (default `,`)
+
+    segment_separator
+      separator between segments (default `|`)
+
+    block_size
+      number of bytes of the file scanned at once when indexing the segments
+      (limits memory use).
+    """
+
+    def __init__(self, path, separator=",", segment_separator="|", block_size=2 ** 22):
+        self.path = path
+        self.separator = separator
+        self.segment_separator = segment_separator
+        with open(path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.buffer[:1] != b">":
+            raise ValueError("Invalid sequence format")
+        header_end = self.buffer.find(b"\n")
+        self.name = self.buffer[1:header_end].decode("utf8").rstrip("\r")
+        sequence_start = header_end + 1
+        sequence_end = self.buffer.find(b"\n", sequence_start)
+        if sequence_end == -1:
+            sequence_end = len(self.buffer)
+        if self.buffer[sequence_end - 1 : sequence_end] == b"\r":
+            sequence_end -= 1
+        last_character = self.buffer[sequence_end - 1 : sequence_end]
+        if last_character != segment_separator.encode("utf8"):
+            raise ValueError(
+                "Invalid sequence format: sequence must end in " + segment_separator
+            )
+
+        codes = np.frombuffer(self.buffer, dtype=np.uint8)[sequence_start:sequence_end]
+        # int32 indexes are enough for files under 2 GB:
+        index_dtype = np.int32 if len(self.buffer) < 2 ** 31 else np.int64
+        starts, lengths = self._index_segments(codes, block_size, index_dtype)
+        # Byte offsets of the segments in the file, and their nucleotide locations:
+        self.segment_offsets = np.empty(len(starts) + 1, dtype=index_dtype)
+        self.segment_offsets[:-1] = starts
+        self.segment_offsets[-1] = len(codes)
+        self.segment_offsets += sequence_start
+        self.segment_locations = np.zeros(len(lengths) + 1, dtype=index_dtype)
+        np.cumsum(lengths, out=self.segment_locations[1:])
+
+    def _index_segments(self, codes, block_size, index_dtype):
+        """Return arrays of the start and the length (length of the first choice)
+        of each segment in codes.
+
+        The codes are scanned in blocks of block_size bytes, so the temporary
+        arrays do not grow with the file size.
+        """
+        segment_separator = ord(self.segment_separator)
+        separator = ord(self.separator)
+        starts = []
+        lengths = []
+        segment_start = 0  # start of the current segment
+        segment_length = None  # None: first separator of the segment not found yet
+        for block_start in range(0, len(codes), block_size):
+            block = codes[block_start : block_start + block_size]
+            ends = np.flatnonzero(block == segment_separator) + block_start
+            separators = np.flatnonzero(block == separator) + block_start
+            if len(ends):
+                block_starts = np.concatenate([[segment_start], ends[:-1] + 1])
+                # The first separator of each segment, if before its end:
+                first_separators = np.concatenate([separators, [len(codes)]])[
+                    np.searchsorted(separators, block_starts)
+                ]
+                block_lengths = np.minimum(first_separators, ends) - block_starts
+                if segment_length is not None:  # found in a previous block
+                    block_lengths[0] = segment_length
+                starts.append(block_starts.astype(index_dtype))
+                lengths.append(block_lengths.astype(index_dtype))
+                segment_start = int(ends[-1]) + 1
+                segment_length = None
+            if segment_length is None:  # look for the first separator of the segment
+                i = np.searchsorted(separators, segment_start)
+                if i < len(separators):
+                    segment_length = int(separators[i]) - segment_start
+        if len(starts) == 0:
+            return np.zeros(0, dtype=index_dtype), np.zeros(0, dtype=index_dtype)
+        return np.concatenate(starts), np.concatenate(lengths)
+
+    def __len__(self):
+        """Return the number of segments."""
+        return len(self.segment_offsets) - 1
+
+    @property
+    def sequence_length(self):
+        return int(self.segment_locations[-1])
+
+    def close(self):
+        self.buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def segment(self, i):
+        """Return the DNA Chisel MutationChoice of the segment number i."""
+        if not 0 <= i < len(self):
+            raise IndexError("Segment index out of range")
+        start = int(self.segment_offsets[i])
+        end = int(self.segment_offsets[i + 1]) - 1  # remove the segment separator
+        seqs = self.buffer[start:end].decode("utf8").split(self.separator)
+        loc = (int(self.segment_locations[i]), int(self.segment_locations[i + 1]))
+        return dnachisel.MutationSpace.MutationChoice(loc, seqs)
+
+    def segment_index(self, pos):
+        """Return the number of the segment at a nucleotide position."""
+        if not 0 <= pos < self.sequence_length:
+            raise IndexError("Position out of range")
+        return int(np.searchsorted(self.segment_locations, pos, side="right")) - 1
+
+    def choices_at(self, pos):
+        """Return the DNA Chisel MutationChoice at a nucleotide position."""
+        return self.segment(self.segment_index(pos))
+
+    def get_mutation_space(self, start=None, end=None):
+        """Return a DNA Chisel MutationSpace of the segments overlapping the
+        window [start, end) (default: the whole space).
+
+        The locations are those of the whole sequence (the positions before the
+        first segment are left-padded).
+        """
+        if start is None:
+            start = 0
+        if end is None:
+            end = self.sequence_length
+        first = self.segment_index(start)
+        last = self.segment_index(end - 1)
+        mutation_choices = []
+        for i in range(first, last + 1):
+            choice = self.segment(i)
+            # one MutationChoice for each letter position:
+            mutation_choices += [choice] * (choice.end - choice.start)
+        left_padding = int(self.segment_locations[first])
+        return dnachisel.MutationSpace.MutationSpace(
+            mutation_choices, left_padding=left_padding
+        )
+
+    def get_seqspace(self, start=None, end=None):
+        """Return a SeqSpace of the window [start, end) (default: the whole
+        space), see `get_mutation_space()`."""
+        space = self.get_mutation_space(start, end)
+        return SeqSpace(
+            space,
+            self.name,
+            separator=self.separator,
+            segment_separator=self.segment_separator,
+        )
+
+
+"""Start of .seqspacez files, followed by the compression code."""
+seqspacez_magic = b"SEQSPACEZ"
+seqspacez_compressions = {None: 0, "gzip": 1, "zstd": 2}
+
+
+class SeqSpaceZWriter:
+    """Streaming writer of the binary .seqspacez format.
+
+    The file holds a dictionary of the distinct choice sets, and a uint16 array
+    of the choice set number of each segment. After the header (magic and
+    compression code), the (optionally compressed) stream is made of records:
+
+    - `N` + uint32 length + name (utf8)
+    - `C` + uint16 number of choices + uint32 choice length + the choices (ascii):
+      the next choice set of the dictionary, written before its first use.
+    - `S` + uint32 number of segments + their choice set numbers (uint16).
+
+    All numbers are little-endian. Use as a context manager, or call `close()`.
+
+    Parameters
+    ----------
+
+    path
+      str path of the file.
+
+    name
+      str name of the sequence.
+
+    compression
+      "gzip", "zstd" (requires the zstandard package) or None.
+
+    chunk_size
+      Number of segments written in each `S` record.
+    """
+
+    def __init__(self, path, name, compression="gzip", chunk_size=65536):
+        if compression not in seqspacez_compressions:
+            raise ValueError("compression must be 'gzip', 'zstd' or None")
+        if compression == "zstd" and not _has_zstandard:
+            raise ImportError("zstd compression requires the zstandard package.")
+        self.file = open(path, "wb")
+        self.file.write(
+            seqspacez_magic + bytes([seqspacez_compressions[compression]])
+        )
+        if compression == "gzip":
+            self.stream = gzip.GzipFile(fileobj=self.file, mode="wb")
+        elif compression == "zstd":
+            self.stream = zstandard.ZstdCompressor().stream_writer(self.file)
+        else:
+            self.stream = self.file
+        self.chunk_size = chunk_size
+        self.choice_set_ids = {}
+        self.segment_ids = []
+        encoded_name = name.encode("utf8")
+        self.stream.write(b"N" + struct.pack("<I", len(encoded_name)) + encoded_name)
+
+    def write_segment(self, variants):
+        """Add a segment, with its list of choices (str of the same length)."""
+        self.segment_ids.append(self._get_choice_set_id(variants))
+        if len(self.segment_ids) >= self.chunk_size:
+            self.flush_segments()
+
+    def write_segment_ids(self, choice_sets, segment_ids):
+        """Add segments given as a list of choice sets (lists of str) and an array
+        of choice set numbers (indices in choice_sets)."""
+        ids = np.array([self._get_choice_set_id(c) for c in choice_sets])
+        self.flush_segments()
+        segment_ids = ids[np.asarray(segment_ids, dtype=np.int64)]
+        for start in range(0, len(segment_ids), self.chunk_size):
+            self._write_segment_chunk(segment_ids[start : start + self.chunk_size])
+
+    def _get_choice_set_id(self, variants):
+        """Return the number of a choice set, writing it if it is new."""
+        key = tuple(variants)
+        if key not in self.choice_set_ids:
+            if len(self.choice_set_ids) == 65536:
+                raise ValueError("The .seqspacez format has at most 65536 choice sets")
+            choice_length = len(key[0]) if len(key) > 0 else 0
+            if any(len(variant) != choice_length for variant in key):
+                raise ValueError("The choices of a segment must have the same length")
+            self.stream.write(
+                b"C"
+                + struct.pack("<HI", len(key), choice_length)
+                + "".join(key).encode("ascii")
+            )
+            self.choice_set_ids[key] = len(self.choice_set_ids)
+        return self.choice_set_ids[key]
+
+    def flush_segments(self):
+        if len(self.segment_ids) > 0:
+            self._write_segment_chunk(np.array(self.segment_ids))
+            self.segment_ids = []
+
+    def _write_segment_chunk(self, segment_ids):
+        self.stream.write(b"S" + struct.pack("<I", len(segment_ids)))
+        self.stream.write(np.asarray(segment_ids, dtype="<u2").tobytes())
+
+    def close(self):
+        self.flush_segments()
+        if self.stream is not self.file:
+            self.stream.close()
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _open_seqspacez_stream(f):
+    """Check the header of a .seqspacez file and return its (decompressed)
+    stream."""
+    header = f.read(len(seqspacez_magic) + 1)
+    if header[:-1] != seqspacez_magic:
+        raise ValueError("Invalid .seqspacez file")
+    compression = header[-1]
+    if compression == seqspacez_compressions["gzip"]:
+        return gzip.GzipFile(fileobj=f, mode="rb")
+    if compression == seqspacez_compressions["zstd"]:
+        if not _has_zstandard:
+            raise ImportError("The file requires the zstandard package.")
+        return zstandard.ZstdDecompressor().stream_reader(f)
+    return f
+
+
+def _read_exactly(stream, size):
+    data = stream.read(size)
+    while len(data) < size:
+        more = stream.read(size - len(data))
+        if not more:
+            raise ValueError("Invalid .seqspacez file: truncated")
+        data += more
+    return data
+
+
+def iter_seqspacez_chunks(path):
+    """Read a .seqspacez file as a stream.
+
+    Yield the name (str) first, then tuples (choice_sets, segment_ids) for each
+    chunk of segments: the list of choice sets defined so far (tuples of str) and
+    the uint16 array of the choice set number of each segment of the chunk.
+    """
+    choice_sets = []
+    with open(path, "rb") as f:
+        stream = _open_seqspacez_stream(f)
+        while True:
+            record_type = stream.read(1)
+            if not record_type:
+                break
+            if record_type == b"N":
+                (length,) = struct.unpack("<I", _read_exactly(stream, 4))
+                yield _read_exactly(stream, length).decode("utf8")
+            elif record_type == b"C":
+                n_choices, choice_length = struct.unpack(
+                    "<HI", _read_exactly(stream, 6)
+                )
+                data = _read_exactly(stream, n_choices * choice_length).decode("ascii")
+                choice_sets.append(
+                    tuple(
+                        data[i * choice_length : (i + 1) * choice_length]
+                        for i in range(n_choices)
+                    )
+                )
+            elif record_type == b"S":
+                (n_segments,) = struct.unpack("<I", _read_exactly(stream, 4))
+                data = _read_exactly(stream, 2 * n_segments)
+                yield (choice_sets, np.frombuffer(data, dtype="<u2"))
+            else:
+                raise ValueError("Invalid .seqspacez file: unknown record")
+
+
+def read_seqspacez_table(path):
+    """Read a .seqspacez file into a compact table.
+
+    Return a tuple (name, choice_sets, segment_ids) with the list of choice sets
+    (tuples of str) and the uint16 array of the choice set number of each segment.
+    """
+    chunks = iter_seqspacez_chunks(path)
+    name = next(chunks)
+    choice_sets = []
+    segment_ids = []
+    for choice_sets, chunk_ids in chunks:
+        segment_ids.append(chunk_ids)
+    if len(segment_ids) == 0:
+        return (name, choice_sets, np.zeros(0, dtype=np.uint16))
+    return (name, choice_sets, np.concatenate(segment_ids).astype(np.uint16))
+
+
+def read_seqspacez(path, separator=",", segment_separator="|"):
+    """Read a SeqSpace from a .seqspacez file (see `SeqSpace.write_binary_file()`).
+
+    Parameters
+    ----------
+
+    path
+      str path to file written by `SeqSpace().write_binary_file()`
+
+    separator
+      separator between segment choices, for the returned SeqSpace (default `,`)
+
+    segment_separator
+      separator between segments, for the returned SeqSpace (default `|`)
+    """
+    name, choice_sets, segment_ids = read_seqspacez_table(path)
+
+    sequence_counter = 0
+    mutation_choices = []
+    for choice_set_id in segment_ids.tolist():
+        seqs = list(choice_sets[choice_set_id])
+        mutationchoice_length = len(seqs[0])
+        loc = (sequence_counter, sequence_counter + mutationchoice_length)
+        choice = dnachisel.MutationSpace.MutationChoice(loc, seqs)
+
+        mutation_choices += [
+            choice
+        ] * mutationchoice_length  # one MutationChoice for each letter position
+        sequence_counter += mutationchoice_length
+
+    space = dnachisel.MutationSpace.MutationSpace(mutation_choices)
+
+    seq_space = SeqSpace(
+        space, name, separator=separator, segment_separator=segment_separator
+    )
+
+    return seq_space
+
+
 def make_aa_to_codon_backtable(codontable):
     """Convert a codontable for use with convert_seq_to_seqspace()
 
@@ -119,7 +604,7 @@ def make_aa_to_codon_backtable(codontable):
     aa_list = list(set(codontable.values()))
     backtable = {key: [] for key in aa_list}
     for codon, aa in codontable.items():
-        backtable[aa] = backtable[aa] + [codon]
+        backtable[aa].append(codon)
 
     return backtable
 
@@ -145,11 +630,13 @@ def convert_seq_to_seqspace(seq, backtable, name=None):
 
     mutation_choices = []
     codon_length = len(backtable[seq[0]][0])  # 3 nt / codon
+    # The list of choices of each letter is made once and shared by its segments:
+    letter_seqs = {letter: list(backtable[letter]) for letter in set(seq)}
+    MutationChoice = dnachisel.MutationSpace.MutationChoice
 
     for i, aminoacid in enumerate(seq):
-        seqs = backtable[aminoacid]
         loc = (i * codon_length, i * codon_length + codon_length)
-        choice = dnachisel.MutationSpace.MutationChoice(loc, seqs)
+        choice = MutationChoice(loc, letter_seqs[aminoacid])
 
         mutation_choices += [choice] * codon_length
 
@@ -159,6 +646,242 @@ def convert_seq_to_seqspace(seq, backtable, name=None):
     return seq_space
 
 
+def make_choice_id_table(backtable):
+    """Return the choice sets and the letter to choice set number table for
+    convert_seq_to_choice_ids().
+
+    Returns a tuple (choice_sets, letter_ids) with the list of choice sets (tuples
+    of str, in the order of the backtable) and a uint16 array (256) of the choice
+    set number of each ASCII code (65535 for letters not in the backtable).
+    """
+    choice_sets = [tuple(seqs) for seqs in backtable.values()]
+    letter_ids = np.full(256, 65535, dtype=np.uint16)
+    for i, letter in enumerate(backtable):
+        letter_ids[ord(letter)] = i
+    return choice_sets, letter_ids
+
+
+def convert_seq_to_choice_ids(seq, backtable):
+    """Convert an amino acid sequence into a compact table, without making the
+    MutationChoices (see `read_seqspacez_table()`).
+
+    Returns a tuple (choice_sets, segment_ids) with the list of choice sets (one
+    for each letter of the backtable) and the uint16 array of the choice set
+    number of each segment. They can be written with
+    `SeqSpaceZWriter.write_segment_ids()`.
+
+    Parameters
+    ----------
+
+    seq
+      str of letters
+
+    backtable
+      dict of letter: nt in the format `{'F': ['TTT', 'TTC'], 'L': ['TTA', ...`
+    """
+    choice_sets, letter_ids = make_choice_id_table(backtable)
+    segment_ids = letter_ids[np.frombuffer(seq.encode("ascii"), dtype=np.uint8)]
+    if np.any(segment_ids == 65535):
+        raise KeyError("The sequence has letters that are not in the backtable")
+    return choice_sets, segment_ids
+
+
+def convert_fasta_to_seqspaces(
+    records, backtable, as_arrays=False, n_jobs=1, chunksize=16
+):
+    """Create SeqSpaces from many amino acid sequences, in parallel.
+
+    Returns a list of SeqSpace instances (named with the record ids), or if
+    `as_arrays` is True, a tuple (choice_sets, [(name, segment_ids), ...]) with
+    the choice sets shared by all sequences (see `convert_seq_to_choice_ids()`).
+
+    Parameters
+    ----------
+
+    records
+      str path to a FASTA file of proteins, or iterable of Biopython SeqRecords
+      or of (name, sequence) pairs. It is read lazily.
+
+    backtable
+      dict of letter: nt in the format `{'F': ['TTT', 'TTC'], 'L': ['TTA', ...`
+
+    as_arrays
+      If True, return compact arrays instead of SeqSpaces (no MutationChoices).
+
+    n_jobs
+      Number of processes (-1 or None: all CPUs).
+
+    chunksize
+      Number of sequences sent to a process at a time.
+    """
+    if isinstance(records, str):
+        from Bio import SeqIO
+
+        records = SeqIO.parse(records, "fasta")
+    sequences = (
+        (record.id, str(record.seq)) if hasattr(record, "seq") else record
+        for record in records
+    )
+
+    if n_jobs is None or n_jobs < 0:
+        n_jobs = os.cpu_count()
+    if n_jobs == 1:
+        _init_conversion_worker(backtable, as_arrays)
+        results = list(map(_convert_record, sequences))
+    else:
+        # The backtable is sent (and the choice table made) once per worker:
+        with multiprocessing.Pool(
+            n_jobs, initializer=_init_conversion_worker, initargs=(backtable, as_arrays)
+        ) as pool:
+            results = list(pool.imap(_convert_record, sequences, chunksize=chunksize))
+
+    if as_arrays:
+        choice_sets, _ = make_choice_id_table(backtable)
+        return choice_sets, results
+    return results
+
+
+_conversion_worker_data = {}
+
+
+def _init_conversion_worker(backtable, as_arrays):
+    _conversion_worker_data["backtable"] = backtable
+    _conversion_worker_data["as_arrays"] = as_arrays
+    _conversion_worker_data["letter_ids"] = make_choice_id_table(backtable)[1]
+
+
+def _convert_record(name_and_sequence):
+    """Return the SeqSpace, or (name, segment_ids), of one sequence (see
+    convert_fasta_to_seqspaces())."""
+    name, sequence = name_and_sequence
+    if _conversion_worker_data["as_arrays"]:
+        letter_ids = _conversion_worker_data["letter_ids"]
+        segment_ids = letter_ids[np.frombuffer(sequence.encode("ascii"), np.uint8)]
+        if np.any(segment_ids == 65535):
+            raise KeyError("Sequence %s has letters not in the backtable" % name)
+        return (name, segment_ids)
+    return convert_seq_to_seqspace(
+        sequence, _conversion_worker_data["backtable"], name=name
+    )
+
+
+def prune_seqspace(seq_space, patterns=(), max_homopolymer=None):
+    """Remove the choices that cannot be part of a sequence of the space without
+    forbidden patterns (e.g. enzyme sites) and long homopolymers.
+
+    Returns a new SeqSpace with the same segments, to shrink the MutationSpace
+    before making a DNA Chisel `DnaOptimizationProblem`.
+
+    A forward pass over the segments keeps the possible ends (the last letters)
+    of the sequences without patterns, and the choice of each segment leading
+    from an end to the next. A backward pass then keeps the choices from which
+    the sequence can be completed. No sequence without patterns is lost.
+
+    Parameters
+    ----------
+
+    seq_space
+      SeqSpace instance.
+
+    patterns
+      list of DNA Chisel SequencePattern instances (e.g. `EnzymeSitePattern`), or
+      of str in DNA notation (e.g. "GGTCTC"), searched in both strands.
+
+    max_homopolymer
+      Maximum length of homopolymers, or None.
+    """
+    patterns = [
+        dnachisel.DnaNotationPattern(pattern) if isinstance(pattern, str) else pattern
+        for pattern in patterns
+    ]
+    if max_homopolymer is not None:
+        patterns += [
+            dnachisel.HomopolymerPattern(nt, max_homopolymer + 1) for nt in "ATGC"
+        ]
+    choices = seq_space.space.choices_list
+    if len(patterns) == 0 or len(choices) == 0:
+        return SeqSpace(
+            seq_space.space,
+            seq_space.name,
+            separator=seq_space.separator,
+            segment_separator=seq_space.segment_separator,
+        )
+
+    expression = re.compile(
+        "|".join("(?:%s)" % pattern.expression for pattern in patterns)
+    )
+    reverse_expression = re.compile(
+        "|".join(
+            "(?:%s)" % pattern.expression
+            for pattern in patterns
+            if not pattern.is_palyndromic
+        )
+        or "(?!)"  # no match
+    )
+    memory = max(pattern.size for pattern in patterns) - 1  # letters kept in ends
+
+    def get_next_end(end, variant):
+        """Return the next end, or None if the variant makes a pattern."""
+        sequence = end + variant
+        if expression.search(sequence) or reverse_expression.search(
+            sequence.translate(reverse_complement_table)[::-1]
+        ):
+            return None
+        return sequence[max(0, len(sequence) - memory) :]
+
+    # Forward: for each segment, {end before: [(variant number, end after)]}
+    transitions = []
+    ends = {""}
+    for choice in choices:
+        segment_transitions = {}
+        next_ends = set()
+        for end in ends:
+            segment_transitions[end] = []
+            for i, variant in enumerate(choice.variants):
+                next_end = get_next_end(end, variant)
+                if next_end is not None:
+                    segment_transitions[end].append((i, next_end))
+                    next_ends.add(next_end)
+        transitions.append(segment_transitions)
+        ends = next_ends
+    if len(ends) == 0:
+        raise ValueError("All sequences of the space have a forbidden pattern")
+
+    # Backward: keep the variants leading to ends that can be completed:
+    completed_ends = ends
+    kept_variants = []
+    for segment_transitions in reversed(transitions):
+        kept = set()
+        previous_ends = set()
+        for end, end_transitions in segment_transitions.items():
+            for i, next_end in end_transitions:
+                if next_end in completed_ends:
+                    kept.add(i)
+                    previous_ends.add(end)
+        kept_variants.append(kept)
+        completed_ends = previous_ends
+    kept_variants.reverse()
+
+    mutation_choices = []
+    for choice, kept in zip(choices, kept_variants):
+        seqs = [variant for i, variant in enumerate(choice.variants) if i in kept]
+        new_choice = dnachisel.MutationSpace.MutationChoice(choice.segment, seqs)
+        mutation_choices += [new_choice] * (choice.end - choice.start)
+    space = dnachisel.MutationSpace.MutationSpace(
+        mutation_choices, left_padding=choices[0].start
+    )
+
+    return SeqSpace(
+        space,
+        seq_space.name,
+        separator=seq_space.separator,
+        segment_separator=seq_space.segment_separator,
+    )
+
+
+reverse_complement_table = str.maketrans("ATGCatgc", "TACGtacg")
+
+
 """Extended nucleotide letter to nucleotide letter dictionary"""
 ambiguity_code_to_nt = {
     "A": ["A"],
@@ -42,3 +42,88 @@ def test_convert_seq_to_seqspace():
         == ">AGCTYRWSKMDVHBXN\nA|G|C|T|C,T|A,G|A,T|G,C|T,G|C,A|A,G,T|A,C,G|A,C,T|C,G,T|A,C,G,T|A,C,G,T|\n"
     )
 
+
+def test_seqspacereader(tmp_path):
+    path = str(tmp_path / "test_seq.seqspace")
+    seqspace.SeqSpace(space, "test_seq").write_file(path)
+    with seqspace.SeqSpaceReader(path) as reader:
+        assert reader.name == "test_seq"
+        assert len(reader) == 3
+        assert reader.sequence_length == 6
+        assert reader.segment(1).segment == (2, 5)
+        assert reader.segment(1).variants == ["TTC", "TAA", "GGG"]
+        assert reader.choices_at(5).variants == ["T"]
+        assert reader.get_seqspace().get_string() == "AT,TG|TTC,TAA,GGG|T|"
+        window = reader.get_mutation_space(3, 6)
+        assert [choice.segment for choice in window.choices_list] == [(2, 5), (5, 6)]
+    # Indexing in blocks smaller than the segments gives the same index:
+    with seqspace.SeqSpaceReader(path, block_size=3) as reader:
+        assert reader.segment_offsets.tolist() == [10, 16, 28, 30]
+        assert reader.segment_locations.tolist() == [0, 2, 5, 6]
+
+
+def test_write_binary_file(tmp_path):
+    seq_space = seqspace.SeqSpace(space, "test_seq")
+    for compression in ["gzip", None]:
+        path = str(tmp_path / "test_seq.seqspacez")
+        seq_space.write_binary_file(path, compression=compression)
+        name, choice_sets, segment_ids = seqspace.read_seqspacez_table(path)
+        assert name == "test_seq"
+        assert choice_sets == [("AT", "TG"), ("TTC", "TAA", "GGG"), ("T",)]
+        assert segment_ids.tolist() == [0, 1, 2]
+        new_seq_space = seqspace.read_seqspacez(path)
+        assert new_seq_space.get_string() == "AT,TG|TTC,TAA,GGG|T|"
+
+
+def test_size_and_iter_sequences():
+    seq_space = seqspace.SeqSpace(space, "test_seq")
+    assert seq_space.size() == 6
+    sequences = list(seq_space.iter_sequences())
+    assert sequences == [
+        a + b + c for a in seqs1 for b in seqs2 for c in seqs3
+    ]
+    assert list(seq_space.iter_sequences(start=4)) == sequences[4:]
+
+
+def test_sample():
+    seq_space = seqspace.SeqSpace(space, "test_seq")
+    samples = list(seq_space.sample(100, seed=1, batch_size=30))
+    assert len(samples) == 100
+    assert set(samples) <= set(seq_space.iter_sequences())
+    assert samples == list(seq_space.sample(100, seed=1, batch_size=30))
+
+
+def test_convert_seq_to_choice_ids():
+    choice_sets, segment_ids = seqspace.convert_seq_to_choice_ids(
+        "ACCA", {"A": ["GCT", "GCC"], "C": ["TGT", "TGC"], "F": ["TTT", "TTC"]}
+    )
+    assert choice_sets == [("GCT", "GCC"), ("TGT", "TGC"), ("TTT", "TTC")]
+    assert segment_ids.tolist() == [0, 1, 1, 0]
+
+
+def test_convert_fasta_to_seqspaces(tmp_path):
+    path = str(tmp_path / "proteins.fa")
+    with open(path, "w") as f:
+        f.write(">p1\nAC\n>p2\nCAA\n")
+    backtable = {"A": ["GCT", "GCC"], "C": ["TGT", "TGC"]}
+    seq_spaces = seqspace.convert_fasta_to_seqspaces(path, backtable)
+    assert [seq_space.name for seq_space in seq_spaces] == ["p1", "p2"]
+    assert seq_spaces[1].get_string() == "TGT,TGC|GCT,GCC|GCT,GCC|"
+
+    choice_sets, results = seqspace.convert_fasta_to_seqspaces(
+        path, backtable, as_arrays=True, n_jobs=2
+    )
+    assert choice_sets == [("GCT", "GCC"), ("TGT", "TGC")]
+    assert [(name, ids.tolist()) for name, ids in results] == [
+        ("p1", [0, 1]),
+        ("p2", [1, 0, 0]),
+    ]
+
+
+def test_prune_seqspace():
+    backtable = {"L": ["TTA", "CTT", "CTC"], "F": ["TTT", "TTC"], "K": ["AAA"]}
+    seq_space = seqspace.convert_seq_to_seqspace("LFK", backtable)
+    pruned = seqspace.prune_seqspace(seq_space, ["TCA"], max_homopolymer=3)
+    # CTT makes TTTT with both F codons, TTC makes TCA with AAA:
+    assert pruned.get_string() == "TTA,CTC|TTT|AAA|"
+    assert pruned.size() == 2
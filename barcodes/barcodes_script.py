@@ -5,6 +5,10 @@
 import custom_barcodes
 
 barcode_collection = custom_barcodes.CustomBarcodesCollection.from_specs(n_barcodes=384)
+# For thousands of barcodes, design them in blocks on all CPUs:
+# barcode_collection = custom_barcodes.CustomBarcodesCollection.from_specs(
+#     n_barcodes=10000, block_size=100, n_jobs=-1, seed=123
+# )
 
 for label, barcode in barcode_collection.items():
     print(barcode)
@@ -6,8 +6,11 @@
 
 from collections import OrderedDict
 from copy import deepcopy
+import multiprocessing
 import os
 
+import numpy as np
+
 from Bio import SeqIO
 from Bio.Seq import Seq
 from Bio.SeqFeature import SeqFeature, FeatureLocation
@@ -22,6 +25,7 @@ from dnachisel import (
     RepeatedKmerPattern,
     UniquifyAllKmers,
 )
+from dnachisel.biotools import reverse_complement
 
 
 def sequence_to_record(sequence, features=()):
@@ -99,6 +103,11 @@ class CustomBarcodesCollection(OrderedDict):
         forbidden_enzymes=("BsaI",),
         include_spacers=True,
         names_template="B_%03d",
+        block_size=None,
+        n_jobs=1,
+        seed=None,
+        kmer_size=12,
+        max_redesign_rounds=10,
     ):
         """Return a CustomBarcodesCollection object with compatible barcodes.
 
@@ -126,34 +135,44 @@ class CustomBarcodesCollection(OrderedDict):
 
         **names_template**
         > The template used to name barcode number "i".
-        """
-        unit_length = barcode_length + len(spacer)
-        seq_len = n_barcodes * unit_length
-        units_coordinates = [
-            (i, i + unit_length) for i in range(0, seq_len, unit_length)
-        ]
 
-        constraints = [
-            AvoidPattern(EnzymeSitePattern(enzyme)) for enzyme in forbidden_enzymes
-        ]
-        constraints += [AvoidPattern(RepeatedKmerPattern(4, 1))]
-
-        for start, end in units_coordinates:
-            constraints += [
-                UniquifyAllKmers(
-                    barcode_length, reference=None, location=(end - len(spacer), end)
-                ),
-                EnforceGCContent(
-                    mini=0.3, maxi=0.7, location=(start, end - len(spacer))
-                ),
-            ]
-        problem = DnaOptimizationProblem(
-            sequence=random_dna_sequence(seq_len), constraints=constraints
-        )
-        problem.logger.ignored_bars.add("location")
-        problem.resolve_constraints()
+        **block_size**
+        > If not None, the barcodes are designed in independent blocks of
+          `block_size` barcodes (one DNA Chisel problem each), then checked
+          together for uniqueness: barcodes sharing a `kmer_size`-mer (or its
+          reverse complement) with a previous barcode are redesigned. This is
+          much faster for thousands of barcodes.
+
+        **n_jobs**
+        > Number of processes designing the blocks (-1 or None: all CPUs).
+
+        **seed**
+        > Seed of the random generator, for reproducibility.
+
+        **kmer_size**
+        > Size of the k-mers that must be unique across the barcodes (without
+          spacers) when designing in blocks.
+
+        **max_redesign_rounds**
+        > Maximum number of rounds of redesign of the conflicting barcodes.
+        """
+        if block_size is None:
+            barcodes = _design_barcodes(
+                (n_barcodes, barcode_length, spacer, forbidden_enzymes, seed)
+            )
+        else:
+            barcodes = _design_barcodes_in_blocks(
+                n_barcodes,
+                barcode_length,
+                spacer,
+                forbidden_enzymes,
+                block_size,
+                n_jobs,
+                seed,
+                kmer_size,
+                max_redesign_rounds,
+            )
 
-        barcodes = [problem.sequence[start:end] for (start, end) in units_coordinates]
         if not include_spacers:
             barcodes = [b[: -len(spacer)] for b in barcodes]
         names = [(names_template % (i + 1)) for i in range(len(barcodes))]
@@ -189,3 +208,99 @@ class CustomBarcodesCollection(OrderedDict):
                 write_record(r, os.path.join(path, "%s.gb" % r.id))
 
         return records
+
+
+def _design_barcodes(task):
+    """Return a list of barcodes (with spacers) designed in one DNA Chisel problem.
+
+    The task is a tuple (n_barcodes, barcode_length, spacer, forbidden_enzymes,
+    seed).
+    """
+    n_barcodes, barcode_length, spacer, forbidden_enzymes, seed = task
+    unit_length = barcode_length + len(spacer)
+    seq_len = n_barcodes * unit_length
+    units_coordinates = [(i, i + unit_length) for i in range(0, seq_len, unit_length)]
+
+    constraints = [
+        AvoidPattern(EnzymeSitePattern(enzyme)) for enzyme in forbidden_enzymes
+    ]
+    constraints += [AvoidPattern(RepeatedKmerPattern(4, 1))]
+
+    for start, end in units_coordinates:
+        constraints += [
+            UniquifyAllKmers(
+                barcode_length, reference=None, location=(end - len(spacer), end)
+            ),
+            EnforceGCContent(mini=0.3, maxi=0.7, location=(start, end - len(spacer))),
+        ]
+    problem = DnaOptimizationProblem(
+        sequence=random_dna_sequence(seq_len, seed=seed), constraints=constraints
+    )
+    problem.logger.ignored_bars.add("location")
+    problem.resolve_constraints()
+
+    return [problem.sequence[start:end] for (start, end) in units_coordinates]
+
+
+def _design_barcodes_in_blocks(
+    n_barcodes,
+    barcode_length,
+    spacer,
+    forbidden_enzymes,
+    block_size,
+    n_jobs,
+    seed,
+    kmer_size,
+    max_redesign_rounds,
+):
+    """Return a list of barcodes (with spacers) designed in independent blocks,
+    with the barcodes that are not unique redesigned (see
+    `CustomBarcodesCollection.from_specs()`)."""
+    rng = np.random.default_rng(seed)
+
+    def make_tasks(n):
+        block_sizes = [min(block_size, n - start) for start in range(0, n, block_size)]
+        seeds = rng.integers(0, 2 ** 31, size=len(block_sizes)).tolist()
+        return [
+            (size, barcode_length, spacer, forbidden_enzymes, block_seed)
+            for size, block_seed in zip(block_sizes, seeds)
+        ]
+
+    if n_jobs is None or n_jobs < 0:
+        n_jobs = os.cpu_count()
+    pool = multiprocessing.Pool(n_jobs) if n_jobs != 1 else None
+    try:
+        barcodes = []
+        kmers = set()  # kmers of the accepted barcodes and their reverse complements
+        n_missing = n_barcodes
+        for _ in range(max_redesign_rounds + 1):
+            tasks = make_tasks(n_missing)
+            if pool is None:
+                blocks = map(_design_barcodes, tasks)
+            else:
+                blocks = pool.imap(_design_barcodes, tasks)
+            for block in blocks:
+                for barcode in block:
+                    barcode_kmers = _get_barcode_kmers(
+                        barcode[:barcode_length], kmer_size
+                    )
+                    if kmers.isdisjoint(barcode_kmers):
+                        barcodes.append(barcode)
+                        kmers.update(barcode_kmers)
+            n_missing = n_barcodes - len(barcodes)
+            if n_missing == 0:
+                return barcodes
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    raise ValueError(
+        "%d barcodes are still not unique after %d rounds of redesign"
+        % (n_missing, max_redesign_rounds)
+    )
+
+
+def _get_barcode_kmers(barcode, k):
+    """Return the set of kmers of a barcode and of its reverse complement."""
+    kmers = {barcode[i : i + k] for i in range(len(barcode) - k + 1)}
+    return kmers | {reverse_complement(kmer) for kmer in kmers}
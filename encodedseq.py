@@ -0,0 +1,204 @@
+import numpy as np
+
+
+"""Symbols of the packed modes. The 4-bit order is the IUPAC bitmask
+(A=1, C=2, G=4, T=8), so that e.g. S (C or G) = 2 + 4 = 6."""
+alphabets = {
+    "2bit": "ACGT",
+    "4bit": "-ACMGRSVTWYHKDBN",
+}
+
+complement_table = {
+    "A": "T",
+    "G": "C",
+    "C": "G",
+    "T": "A",
+    "Y": "R",
+    "R": "Y",
+    "W": "W",
+    "S": "S",
+    "K": "M",
+    "M": "K",
+    "D": "H",
+    "V": "B",
+    "H": "D",
+    "B": "V",
+    "X": "X",
+    "N": "N",
+}
+
+
+def make_complement_codes(complement_table):
+    """Return a uint8 array (256) mapping ASCII codes to their complement.
+
+    Both cases are included. Characters not in the table map to themselves.
+    """
+    complement_codes = np.arange(256, dtype=np.uint8)
+    for letter, complement in complement_table.items():
+        complement_codes[ord(letter.upper())] = ord(complement.upper())
+        complement_codes[ord(letter.lower())] = ord(complement.lower())
+    return complement_codes
+
+
+def make_symbol_codes(alphabet):
+    """Return a uint8 array (256) mapping ASCII codes to their index in alphabet.
+
+    Characters not in the alphabet map to 255.
+    """
+    symbol_codes = np.full(256, 255, dtype=np.uint8)
+    for i, letter in enumerate(alphabet):
+        symbol_codes[ord(letter)] = i
+    return symbol_codes
+
+
+complement_codes = make_complement_codes(complement_table)
+alphabet_codes = {
+    mode: np.frombuffer(alphabet.encode("ascii"), dtype=np.uint8)
+    for mode, alphabet in alphabets.items()
+}
+symbol_codes = {
+    mode: make_symbol_codes(alphabet) for mode, alphabet in alphabets.items()
+}
+
+
+class EncodedSeq:
+    """Sequence stored in a uint8 NumPy array.
+
+    Pure ACGT sequences are packed 4 letters per byte ("2bit" mode), and uppercase
+    IUPAC sequences 2 letters per byte ("4bit"). Other sequences (e.g. lowercase)
+    are stored with one ASCII code per byte ("ascii").
+
+    Slices with step 1 are views sharing the array of the original sequence. The
+    input str is not kept: the `str` of the sequence is made on first use and
+    cached, until `clear_cache()` is called. `np.asarray()` of an
+    EncodedSeq returns its ASCII codes, so functions that work on uint8 arrays
+    (e.g. `seqdistance.hamming()`) accept it.
+
+    Parameters
+    ----------
+
+    sequence
+      str, bytes, EncodedSeq or array of ASCII codes.
+
+    mode
+      "2bit", "4bit", "ascii", or "auto" for the most compact mode for the sequence.
+    """
+
+    def __init__(self, sequence, mode="auto"):
+        self._str = None
+        if isinstance(sequence, EncodedSeq):
+            codes = sequence.codes
+        elif isinstance(sequence, str):
+            codes = np.frombuffer(sequence.encode("ascii"), dtype=np.uint8)
+        elif isinstance(sequence, bytes):
+            codes = np.frombuffer(sequence, dtype=np.uint8)
+        else:
+            codes = np.asarray(sequence, dtype=np.uint8)
+
+        if mode == "auto":
+            mode = "ascii"
+            for packed_mode in ["2bit", "4bit"]:
+                if not np.any(symbol_codes[packed_mode][codes] == 255):
+                    mode = packed_mode
+                    break
+        if mode not in ["2bit", "4bit", "ascii"]:
+            raise ValueError("mode must be '2bit', '4bit', 'ascii' or 'auto'")
+
+        self.mode = mode
+        self.start = 0
+        self.length = len(codes)
+        self.data = codes if mode == "ascii" else self.pack(codes, mode)
+
+    @staticmethod
+    def pack(codes, mode):
+        """Return a uint8 array of ASCII codes packed into 2 or 4 bits per letter."""
+        symbols = symbol_codes[mode][codes]
+        if np.any(symbols == 255):
+            raise ValueError("Sequence contains letters not allowed in %s mode" % mode)
+        bits = 2 if mode == "2bit" else 4
+        letters_per_byte = 8 // bits
+        padding = -len(symbols) % letters_per_byte
+        symbols = np.concatenate([symbols, np.zeros(padding, dtype=np.uint8)])
+        symbols = symbols.reshape(-1, letters_per_byte)
+        packed = np.zeros(len(symbols), dtype=np.uint8)
+        for i in range(letters_per_byte):
+            packed |= symbols[:, i] << (i * bits)
+        return packed
+
+    @classmethod
+    def from_packed(cls, data, length, mode, start=0):
+        """Return an EncodedSeq using an array packed by `EncodedSeq.pack()`."""
+        encoded_seq = cls.__new__(cls)
+        encoded_seq._str = None
+        encoded_seq.data = data
+        encoded_seq.mode = mode
+        encoded_seq.start = start
+        encoded_seq.length = length
+        return encoded_seq
+
+    @property
+    def codes(self):
+        """uint8 array of the ASCII codes of the sequence (a view in ascii mode)."""
+        if self.mode == "ascii":
+            return self.data[self.start : self.start + self.length]
+        bits = 2 if self.mode == "2bit" else 4
+        letters_per_byte = 8 // bits
+        positions = np.arange(self.start, self.start + self.length)
+        symbols = self.data[positions // letters_per_byte] >> (
+            (positions % letters_per_byte) * bits
+        ).astype(np.uint8)
+        return alphabet_codes[self.mode][symbols & ((1 << bits) - 1)]
+
+    @property
+    def nbytes(self):
+        """Number of bytes of the array storing the sequence."""
+        return self.data.nbytes
+
+    def reverse_complement(self):
+        """Return the reverse complement, as an EncodedSeq of the same mode."""
+        return EncodedSeq(complement_codes[self.codes[::-1]], mode=self.mode)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            if step != 1:
+                return EncodedSeq(self.codes[key], mode=self.mode)
+            return EncodedSeq.from_packed(
+                self.data, max(0, stop - start), self.mode, start=self.start + start
+            )
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError("EncodedSeq index out of range")
+        return chr(self[key : key + 1].codes[0])
+
+    def __str__(self):
+        if self._str is None:
+            self._str = self.codes.tobytes().decode("ascii")
+        return self._str
+
+    def clear_cache(self):
+        """Drop the cached `str` of the sequence, to free its memory."""
+        self._str = None
+
+    def __repr__(self):
+        return "EncodedSeq(%r, mode=%r)" % (str(self), self.mode)
+
+    def __eq__(self, other):
+        if isinstance(other, str):
+            other = np.frombuffer(other.encode("ascii", "replace"), dtype=np.uint8)
+        elif isinstance(other, EncodedSeq):
+            other = other.codes
+        else:
+            return NotImplemented
+        return np.array_equal(self.codes, other)
+
+    def __hash__(self):
+        return hash(self.codes.tobytes().decode("ascii"))  # same as the str
+
+    def __array__(self, dtype=None, copy=None):
+        codes = self.codes
+        return codes if dtype is None else codes.astype(dtype, copy=False)
@@ -4,11 +4,16 @@ input_files = [
     "example1.fasta",
     "example2.fasta",
     ]
+streaming = True  # False: load the records with DNA Cauldron
+processes = None  # number of files summarized in parallel (None: number of CPUs)
 ###############################################################################
 
-import dnacauldron as dc
+import multiprocessing
+
 
 def summarize_fasta_file(input_file):
+    import dnacauldron as dc
+
     parts = dc.biotools.load_records_from_files(files=[input_file], use_file_names_as_ids=False)
     total_length = 0
     for part in parts:
@@ -19,5 +24,74 @@ def summarize_fasta_file(input_file):
     print()
 
 
-for input_file in input_files:
-    summarize_fasta_file(input_file)
+def count_dna(input_file):
+    """Count the sequences, basepairs, GC and N50 of a FASTA or GenBank file.
+
+    The file is read line by line, without making records, so it uses constant
+    memory (plus one number per sequence, for the N50). GenBank sequences are
+    read from their ORIGIN blocks.
+    """
+    lengths = []
+    length = None  # length of the current sequence (None: outside of sequences)
+    gc = 0
+    in_genbank_sequence = False
+    with open(input_file, "rb") as f:
+        for line in f:
+            if line.startswith(b">"):  # FASTA header
+                if length is not None:
+                    lengths.append(length)
+                length = 0
+            elif line.startswith(b"ORIGIN"):
+                length = 0
+                in_genbank_sequence = True
+            elif line.startswith(b"//"):  # end of GenBank record
+                if length is not None:
+                    lengths.append(length)
+                length = None
+                in_genbank_sequence = False
+            elif length is not None:
+                if in_genbank_sequence:  # remove positions and spaces
+                    line = line.translate(None, b"0123456789 \t\r\n")
+                else:
+                    line = line.rstrip()
+                length += len(line)
+                gc += line.count(b"G") + line.count(b"C")
+                gc += line.count(b"g") + line.count(b"c")
+    if length is not None and not in_genbank_sequence:  # last FASTA sequence
+        lengths.append(length)
+
+    total_length = sum(lengths)
+    n50 = 0
+    cumulative_length = 0
+    for sequence_length in sorted(lengths, reverse=True):
+        cumulative_length += sequence_length
+        if 2 * cumulative_length >= total_length:
+            n50 = sequence_length
+            break
+    return {
+        "file": input_file,
+        "sequences": len(lengths),
+        "bp": total_length,
+        "gc": gc / total_length if total_length else 0,
+        "n50": n50,
+    }
+
+
+def summarize_files_streaming(input_files, processes=None):
+    """Print the counts of `count_dna()` of each file, computed in parallel."""
+    with multiprocessing.Pool(processes) as pool:
+        for summary in pool.imap(count_dna, input_files):
+            print(summary["file"])
+            print(summary["sequences"], "sequences")
+            print(summary["bp"], "bp")
+            print("GC: %.2f%%" % (100 * summary["gc"]))
+            print("N50:", summary["n50"], "bp")
+            print()
+
+
+if __name__ == "__main__":
+    if streaming:
+        summarize_files_streaming(input_files, processes=processes)
+    else:
+        for input_file in input_files:
+            summarize_fasta_file(input_file)
@@ -1,14 +1,21 @@
 import genealloy
+import numpy as np
+
+from encodedseq import EncodedSeq
 
 try:
     import rapidfuzz
+    import rapidfuzz.distance
+    import rapidfuzz.process
 except ImportError:
     _has_rapidfuzz = False
 else:
     _has_rapidfuzz = True
 
 
-def differentiate_sequences(seq, ref=None, verbose=True):
+def differentiate_sequences(
+    seq, ref=None, verbose=True, objective=None, max_homopolymer=None, gc_range=None
+):
     """Replace each codon in a sequence with a synonymous codon that does not match the 
     reference sequence.
 
@@ -26,6 +33,18 @@ def differentiate_sequences(seq, ref=None, verbose=True):
 
     verbose
       Print aa sequence and Levenshtein distances. 
+
+    objective
+      If None, the solution uses the first possible codon of each position.
+      Otherwise, the codons are chosen with `optimize_codons()` to maximize the
+      distance to the reference: "hamming" or "kmer" (see there).
+
+    max_homopolymer
+      Maximum length of homopolymers in the solution (used with `objective`).
+
+    gc_range
+      `(minimum, maximum)` GC content (fraction) of the solution (used with
+      `objective`).
     """
 
     if ref is None:
@@ -47,33 +66,27 @@ def differentiate_sequences(seq, ref=None, verbose=True):
 
     verboseprint("The aa sequence is:", "".join(seq_aa))
 
-    aa_to_codon = generate_aa_to_codon(genealloy.codon_to_aa)
-
-    modified_seq_codons = []
-    for i, triplet in enumerate(seq_codons):
-        ref_triplet = ref[i * 3 : i * 3 + 3]
-        if triplet != ref_triplet:
-            replacement = [triplet]
-        else:
-            replacement = []
-            aa = genealloy.codon_to_aa[triplet]
-            for codon in aa_to_codon[aa]:
-                if codon != ref_triplet:
-                    replacement.append(codon)
-            if len(replacement) == 0:
-                replacement = [triplet]  # no alternative codon
-        modified_seq_codons.append(replacement)
-
-    modified_seq = "".join([codons[0] for codons in modified_seq_codons])
+    seq_indices = encode_codons(seq)
+    ref_indices = encode_codons(ref)
+    modified_seq = decode_codons(differentiate_codon_indices(seq_indices, ref_indices))
+    modified_seq_codons = list_alternative_codons(seq_indices, ref_indices)
+    if objective is not None:
+        modified_seq = optimize_codons(
+            modified_seq_codons,
+            ref,
+            objective=objective,
+            max_homopolymer=max_homopolymer,
+            gc_range=gc_range,
+        )
 
     if _has_rapidfuzz:
         verboseprint(
             "Levenshtein distance (seq vs ref):",
-            rapidfuzz.levenshtein.distance(seq, ref),
+            rapidfuzz.distance.Levenshtein.distance(seq, ref),
         )
         verboseprint(
             "Levenshtein distance (modified seq vs ref):",
-            rapidfuzz.levenshtein.distance(modified_seq, ref),
+            rapidfuzz.distance.Levenshtein.distance(modified_seq, ref),
         )
     else:
         verboseprint("Levenshtein distance requires the rapidfuzz package")
@@ -81,6 +94,231 @@ def differentiate_sequences(seq, ref=None, verbose=True):
     return {"solution": modified_seq, "codons": modified_seq_codons}
 
 
+def optimize_codons(
+    codons, ref, objective="hamming", max_homopolymer=None, gc_range=None
+):
+    """Choose a codon for each position, to maximize the distance to a reference.
+
+    Dynamic programming over the positions, in linear time in the sequence length.
+    The state after each position is the last letter and the length of its
+    homopolymer (if `max_homopolymer` is set), and the last letters of the
+    sequence (for the "kmer" objective).
+
+    Return the sequence (str) made of the chosen codons.
+
+    Parameters
+    ----------
+
+    codons
+      List of the possible codons at each position (e.g. the "codons" returned by
+      `differentiate_sequences()`).
+
+    ref
+      A string of ATGC characters, with length 3 times the number of positions.
+
+    objective
+      "hamming" maximizes the Hamming distance to `ref`. "kmer" minimizes the
+      length of the longest substring shared with `ref` (anywhere in `ref`, found
+      by bisection), then maximizes the Hamming distance.
+
+    max_homopolymer
+      Maximum length of homopolymers in the solution, or None.
+
+    gc_range
+      `(minimum, maximum)` GC content of the solution (fraction), or None. The
+      codons are then chosen with a GC bonus (or penalty), adjusted by bisection
+      to reach the range.
+    """
+    if objective not in ["hamming", "kmer"]:
+        raise ValueError("objective must be 'hamming' or 'kmer'")
+    if len(ref) != 3 * len(codons):
+        raise ValueError("`ref` must have 3 letters for each position")
+
+    # For each position: (codon, Hamming distance to ref, GC count) options
+    options = []
+    for i, position_codons in enumerate(codons):
+        ref_codon = ref[3 * i : 3 * i + 3]
+        position_options = []
+        for codon in position_codons:
+            distance = sum(a != b for a, b in zip(codon, ref_codon))
+            gc = sum(letter in "GC" for letter in codon)
+            position_options.append((codon, distance, gc))
+        options.append(position_options)
+
+    ref_kmers = None
+    if objective == "kmer":
+        # Bisection on k, the length of the shortest substrings not shared with
+        # ref (a solution without shared k-mers has no shared (k+1)-mers):
+        solution = _optimize_codons(options, max_homopolymer)
+        if solution is None:
+            raise ValueError("No solution within the homopolymer limit")
+        low, high = 0, find_longest_shared_substring(solution, ref) + 1
+        while high - low > 1:
+            middle = (low + high) // 2
+            kmers = get_kmers(ref, middle)
+            if _optimize_codons(options, max_homopolymer, kmers) is None:
+                low = middle
+            else:
+                high = middle
+        ref_kmers = get_kmers(ref, high)
+
+    solution = _optimize_codons(options, max_homopolymer, ref_kmers)
+    if solution is None:
+        raise ValueError("No solution within the homopolymer limit")
+    if gc_range is None or len(ref) == 0:
+        return solution
+
+    minimum, maximum = gc_range
+
+    def get_gc_content(sequence):
+        return (sequence.count("G") + sequence.count("C")) / len(sequence)
+
+    gc_content = get_gc_content(solution)
+    if minimum <= gc_content <= maximum:
+        return solution
+    # A GC bonus (or penalty) larger than 3 outweighs the Hamming distance:
+    direction = 1 if gc_content < minimum else -1
+    low, high = 0.0, 4.0
+    best = None
+    closest = solution  # closest to the range, on the side of the start
+    for _ in range(12):
+        gc_bonus = (low + high) / 2
+        candidate = _optimize_codons(
+            options, max_homopolymer, ref_kmers, gc_bonus=direction * gc_bonus
+        )
+        gc_content = get_gc_content(candidate)
+        if minimum <= gc_content <= maximum:
+            best = candidate
+            high = gc_bonus  # try a smaller bonus, for a larger distance
+        elif (gc_content < minimum) == (direction == 1):
+            low = gc_bonus
+            closest = candidate
+        else:
+            high = gc_bonus
+    if best is None:  # the bonus jumps over the range: change codons one by one
+        best = _adjust_gc_content(
+            closest, options, direction, gc_range, max_homopolymer, ref_kmers
+        )
+    return best
+
+
+def get_kmers(seq, k):
+    """Return the set of substrings of length k of a string."""
+    return {seq[i : i + k] for i in range(len(seq) - k + 1)}
+
+
+def find_longest_shared_substring(seq, ref):
+    """Return the length of the longest substring of seq that is also in ref."""
+    low, high = 0, min(len(seq), len(ref)) + 1  # shared, not shared
+    while high - low > 1:
+        middle = (low + high) // 2
+        if get_kmers(seq, middle).isdisjoint(get_kmers(ref, middle)):
+            high = middle
+        else:
+            low = middle
+    return low
+
+
+def _adjust_gc_content(
+    solution, options, direction, gc_range, max_homopolymer, ref_kmers
+):
+    """Change codons of a solution of `optimize_codons()` to move its GC content
+    into the range, starting with the changes costing the least distance."""
+    minimum, maximum = gc_range
+    chosen = [solution[3 * i : 3 * i + 3] for i in range(len(options))]
+    gc_count = solution.count("G") + solution.count("C")
+    kmer_size = len(next(iter(ref_kmers))) if ref_kmers else 0
+    changes = []
+    for i, position_options in enumerate(options):
+        current = [option for option in position_options if option[0] == chosen[i]][0]
+        for codon, distance, gc in position_options:
+            gc_change = direction * (gc - current[2])
+            if gc_change > 0:
+                loss = (current[1] - distance) / gc_change
+                changes.append((loss, i, codon, gc - current[2]))
+    changed = set()
+    for _, i, codon, gc_change in sorted(changes):
+        if minimum * len(solution) <= gc_count <= maximum * len(solution):
+            break
+        if i in changed:
+            continue
+        new_gc_count = gc_count + gc_change
+        if direction == 1 and new_gc_count > maximum * len(solution):
+            continue  # would jump over the range
+        if direction == -1 and new_gc_count < minimum * len(solution):
+            continue
+        # Check the limits in the codons around the change:
+        around = max(max_homopolymer or 0, kmer_size) // 3 + 1
+        first = max(0, i - around)
+        neighbourhood = "".join(
+            chosen[first:i] + [codon] + chosen[i + 1 : i + 1 + around]
+        )
+        if max_homopolymer is not None:
+            if find_longest_repeat(neighbourhood)[0] > max_homopolymer:
+                continue
+        if ref_kmers:
+            if not ref_kmers.isdisjoint(get_kmers(neighbourhood, kmer_size)):
+                continue
+        chosen[i] = codon
+        changed.add(i)
+        gc_count = new_gc_count
+    if not minimum * len(solution) <= gc_count <= maximum * len(solution):
+        raise ValueError("The GC content range cannot be reached")
+    return "".join(chosen)
+
+
+def _optimize_codons(options, max_homopolymer, ref_kmers=None, gc_bonus=0):
+    """Return the best sequence for `optimize_codons()`, with a GC bonus per G/C,
+    or None if there is no solution within the limits.
+
+    If ref_kmers (a set of strings of the same length k) is given, the sequence
+    must not contain them.
+    """
+    kmer_size = len(next(iter(ref_kmers))) if ref_kmers else 0
+    # state (last letter, homopolymer length, last k - 1 letters):
+    # (-score, previous state, codon), lowest is best
+    states = {("", 0, ""): (0, None, None)}
+    history = []
+    for position_options in options:
+        new_states = {}
+        for state, (value, _, _) in states.items():
+            for codon, distance, gc in position_options:
+                letter, homopolymer, end = state
+                longest_homopolymer = 0
+                for nt in codon:
+                    homopolymer = homopolymer + 1 if nt == letter else 1
+                    longest_homopolymer = max(longest_homopolymer, homopolymer)
+                    letter = nt
+                if max_homopolymer is None:
+                    letter, homopolymer = "", 0  # not tracked
+                elif longest_homopolymer > max_homopolymer:
+                    continue
+                if kmer_size > 0:
+                    end += codon
+                    if any(
+                        end[i - kmer_size : i] in ref_kmers
+                        for i in range(max(kmer_size, len(end) - 2), len(end) + 1)
+                    ):
+                        continue
+                    if len(end) >= kmer_size:
+                        end = end[len(end) - kmer_size + 1 :]  # last k - 1 letters
+                new_state = (letter, homopolymer, end)
+                new_value = value - distance - gc_bonus * gc
+                if new_state not in new_states or new_value < new_states[new_state][0]:
+                    new_states[new_state] = (new_value, state, codon)
+        if len(new_states) == 0:
+            return None
+        history.append(new_states)
+        states = new_states
+
+    state = min(states, key=lambda state: states[state][0])
+    chosen_codons = []
+    for position_states in reversed(history):
+        _, state, codon = position_states[state]
+        chosen_codons.append(codon)
+    return "".join(reversed(chosen_codons))
+
+
 def generate_aa_to_codon(codon_to_aa):
     aa_to_codon = {}
 
@@ -92,7 +330,142 @@ def generate_aa_to_codon(codon_to_aa):
     return aa_to_codon
 
 
-def find_best_match(seq, ref):
+def make_codon_tables(codon_to_aa):
+    """Return the tables of synonymous codons, indexed by codon index.
+
+    The index of a codon is its number in base 4 (A=0, C=1, G=2, T=3), e.g.
+    "AAA" = 0, "TTT" = 63. Return a dictionary with:
+
+    - "first_alternative": array of the first alternative codon of each codon (in
+      the order of `generate_aa_to_codon()`), or of the codon itself if it has none.
+    - "alternatives": list of the alternative codons (str) of each codon, or
+      of the codon itself if it has none.
+    """
+    aa_to_codon = generate_aa_to_codon(codon_to_aa)
+    first_alternative = np.arange(64)
+    alternatives = []
+    for index, codon in enumerate(codons):
+        synonymous = [
+            other for other in aa_to_codon[codon_to_aa[codon]] if other != codon
+        ]
+        if len(synonymous) == 0:
+            synonymous = [codon]  # no alternative codon
+        first_alternative[index] = codons.index(synonymous[0])
+        alternatives.append(synonymous)
+    return {
+        "first_alternative": first_alternative,
+        "alternatives": alternatives,
+    }
+
+
+nucleotide_indices = np.full(256, 255, dtype=np.uint8)  # A=0, C=1, G=2, T=3
+nucleotide_indices[np.frombuffer(b"ACGT", dtype=np.uint8)] = np.arange(4)
+codons = [a + b + c for a in "ACGT" for b in "ACGT" for c in "ACGT"]
+codon_codes = np.frombuffer("".join(codons).encode("ascii"), dtype=np.uint8).reshape(
+    64, 3
+)
+codon_tables = make_codon_tables(genealloy.codon_to_aa)
+codon_choices = codon_tables["alternatives"] + [[codon] for codon in codons]
+
+
+def encode_codons(seq):
+    """Return the array of codon indices (see `make_codon_tables()`) of a sequence.
+
+    The sequence (str, EncodedSeq or array of ASCII codes) must contain only
+    A, T, G, C and have a length divisible by 3.
+    """
+    if isinstance(seq, str):
+        codes = np.frombuffer(seq.encode("ascii"), dtype=np.uint8)
+    else:
+        codes = np.asarray(seq, dtype=np.uint8)
+    if len(codes) % 3 != 0:
+        raise ValueError("Sequence length must be divisible by 3")
+    indices = nucleotide_indices[codes]
+    if np.any(indices == 255):
+        raise ValueError("The sequences must contain only A,T,G,C")
+    indices = indices.reshape(-1, 3).astype(np.intp)
+    return 16 * indices[:, 0] + 4 * indices[:, 1] + indices[:, 2]
+
+
+def decode_codons(codon_indices):
+    """Return the sequence (str) of an array of codon indices."""
+    return codon_codes[codon_indices].tobytes().decode("ascii")
+
+
+def differentiate_codon_indices(seq_indices, ref_indices):
+    """Return the codon indices of the solution of `differentiate_sequences()`.
+
+    Codons matching the reference are replaced with their first alternative.
+    """
+    return np.where(
+        seq_indices == ref_indices,
+        codon_tables["first_alternative"][seq_indices],
+        seq_indices,
+    )
+
+
+def list_alternative_codons(seq_indices, ref_indices):
+    """Return the list of possible codons of each position (see
+    `differentiate_sequences()`)."""
+    # Lists 0-63: alternatives of codons matching the reference, 64-127: codon only.
+    keys = np.where(seq_indices == ref_indices, seq_indices, seq_indices + 64)
+    return [list(codon_choices[key]) for key in keys.tolist()]
+
+
+def differentiate_sequences_batch(pairs, return_codons=True):
+    """Run `differentiate_sequences()` on many sequences at once.
+
+    All sequences are converted to codon indices and differentiated together,
+    using the codon tables of the module (computed once).
+
+    Return a list of dictionaries with "solution" and "codons" (as returned by
+    `differentiate_sequences()`), in the order of the pairs.
+
+    Parameters
+    ----------
+
+    pairs
+      List of `(seq, ref)` tuples of strings of ATGC characters, with length
+      divisible by 3 (see `differentiate_sequences()`). `ref` can be None. Single
+      sequences are also accepted (differentiated from themselves).
+
+    return_codons
+      If False, only return the solutions ("codons" is None), which is faster.
+    """
+    seqs = []
+    refs = []
+    for pair in pairs:
+        seq, ref = (pair, None) if isinstance(pair, (str, EncodedSeq)) else pair
+        if ref is None:
+            ref = seq
+        if len(seq) % 3 != 0:
+            raise ValueError("Sequence length must be divisible by 3")
+        if len(seq) != len(ref):
+            raise ValueError("`seq` and `ref` must be the same length")
+        seqs.append(str(seq))
+        refs.append(str(ref))
+
+    seq_indices = encode_codons("".join(seqs))
+    ref_indices = encode_codons("".join(refs))
+    solutions = decode_codons(differentiate_codon_indices(seq_indices, ref_indices))
+    if return_codons:
+        all_codons = list_alternative_codons(seq_indices, ref_indices)
+
+    results = []
+    start = 0
+    for seq in seqs:
+        end = start + len(seq)
+        results.append(
+            {
+                "solution": solutions[start:end],
+                "codons": all_codons[start // 3 : end // 3] if return_codons else None,
+            }
+        )
+        start = end
+    return results
+
+
+def find_best_match(seq, ref, mode="window", bit_parallel=False, best_only=False):
     """Find alignment with smallest Levenshtein distance between seq and ref.
     Return a dictionary of distances and positions of best matches.
 
@@ -100,35 +473,262 @@ def find_best_match(seq, ref):
     ----------
 
     seq
-      A string
+      A string (or EncodedSeq)
 
     ref
-      A string, not shorter than seq
+      A string (or EncodedSeq), not shorter than seq
+
+    mode
+      "window" compares seq with each window of ref of the same length (requires
+      the rapidfuzz package). "distances" is then a dictionary of distances, keyed
+      by (start, end) locations. "semiglobal" aligns seq with ref, with free end
+      gaps in ref, in one pass (O(len(seq) * len(ref))), so the matches can be
+      shorter or longer than seq. "distances" is then an array of the distance of
+      the best match ending at each position of ref (0 to len(ref)).
+
+    bit_parallel
+      Use the bit-parallel algorithm of Myers in "semiglobal" mode (for seq up to
+      64 letters).
+
+    best_only
+      If True, only the best matches are returned ("distances" is None).
     """
+    if len(seq) > len(ref):
+        raise ValueError("`ref` is shorter than `seq`")
+
+    if mode == "semiglobal":
+        return _find_best_semiglobal_match(seq, ref, bit_parallel, best_only)
+    if mode != "window":
+        raise ValueError("mode must be 'window' or 'semiglobal'")
 
     if not _has_rapidfuzz:
         raise ImportError("Function requires the rapidfuzz package.")
 
-    if len(seq) > len(ref):
-        raise ValueError("`ref` is shorter than `seq`")
-
+    seq = str(seq)
+    ref = str(ref)
     distances = {}
+    shortest_distance = None
+    locations = []
     for i in range(0, len(ref) - len(seq) + 1):  # moving window of comparison
-        distance = rapidfuzz.levenshtein.distance(seq, ref[i : (i + len(seq))])
-        distances[(i, i + len(seq))] = distance
+        window = ref[i : (i + len(seq))]
+        distance = rapidfuzz.distance.Levenshtein.distance(seq, window)
+        location = (i, i + len(seq))
+        if not best_only:
+            distances[location] = distance
+        if shortest_distance is None or distance < shortest_distance:
+            shortest_distance = distance
+            locations = [location]
+        elif distance == shortest_distance:
+            locations.append(location)
+
+    best_matches = {"distance": shortest_distance, "locations": locations}
+
+    results = {
+        "distances": None if best_only else distances,
+        "best_matches": best_matches,
+    }
+
+    return results
 
-    shortest_distance = min(distances.values())
 
-    best_matches = {distance: shortest_distance, "locations": []}
-    for location, distance in distances.items():
-        if distance == shortest_distance:
-            best_matches["locations"].append(location)
+def _find_best_semiglobal_match(seq, ref, bit_parallel, best_only):
+    """Return the results of `find_best_match()` in "semiglobal" mode."""
+    seq_codes = _get_ascii_codes(seq)
+    ref_codes = _get_ascii_codes(ref)
+    if bit_parallel:
+        if len(seq_codes) > 64:
+            raise ValueError("The bit-parallel algorithm is for seq up to 64 letters")
+        distances = _myers_distances(seq_codes, ref_codes)
+    else:
+        distances = _levenshtein_last_row(seq_codes, ref_codes, free_start=True)
+
+    shortest_distance = int(distances.min())
+    locations = []
+    for end in np.flatnonzero(distances == shortest_distance).tolist():
+        # The start is found by aligning the reversed sequences from the end:
+        first = max(0, end - len(seq_codes) - shortest_distance)
+        row = _levenshtein_last_row(
+            seq_codes[::-1], ref_codes[first:end][::-1], free_start=False
+        )
+        lengths = np.flatnonzero(row == shortest_distance)
+        # The match closest to the length of seq (the longer one in a tie):
+        length = lengths[np.argmin(np.abs(lengths - len(seq_codes) - 0.5))]
+        locations.append((end - int(length), end))
+
+    best_matches = {"distance": shortest_distance, "locations": locations}
 
-    results = {"distances": distances, "best_matches": best_matches}
+    results = {
+        "distances": None if best_only else distances,
+        "best_matches": best_matches,
+    }
 
     return results
 
 
+def _get_ascii_codes(seq):
+    """Return the uint8 array of ASCII codes of a string (or EncodedSeq, Bio Seq,
+    list of letters)."""
+    if isinstance(seq, np.ndarray) or hasattr(seq, "__array__"):
+        return np.asarray(seq, dtype=np.uint8)
+    if isinstance(seq, (list, tuple)):
+        seq = "".join(seq)
+    return np.frombuffer(str(seq).encode("ascii"), dtype=np.uint8)
+
+
+def _levenshtein_last_row(seq_codes, ref_codes, free_start):
+    """Return the Levenshtein distances between seq and each prefix of ref (the
+    last row of the dynamic programming table), as an array (0 to len(ref)).
+
+    The table is computed row by row (one row per letter of seq), each vectorized
+    over ref. If free_start is True, the match can start anywhere in ref.
+    """
+    positions = np.arange(len(ref_codes) + 1)
+    row = np.zeros(len(ref_codes) + 1, dtype=np.int64) if free_start else positions
+    candidates = np.empty(len(ref_codes) + 1, dtype=np.int64)
+    for i, letter in enumerate(seq_codes.tolist(), 1):
+        candidates[0] = i
+        np.minimum(row[:-1] + (ref_codes != letter), row[1:] + 1, out=candidates[1:])
+        # Insertions, i.e. row[j] = min(candidates[k] + j - k) for k <= j:
+        row = np.minimum.accumulate(candidates - positions) + positions
+    return row
+
+
+def _myers_distances(seq_codes, ref_codes):
+    """Return the array of `_levenshtein_last_row()` with free start, computed with
+    the bit-parallel algorithm of Myers (one bit per letter of seq)."""
+    length = len(seq_codes)
+    if length == 0:
+        return np.zeros(len(ref_codes) + 1, dtype=np.int64)
+    peq = {}  # bit mask of the positions of each letter in seq
+    for i, letter in enumerate(seq_codes.tolist()):
+        peq[letter] = peq.get(letter, 0) | (1 << i)
+    mask = (1 << length) - 1
+    last_bit = 1 << (length - 1)
+    pv = mask  # vertical positive and negative differences
+    mv = 0
+    score = length
+    distances = np.empty(len(ref_codes) + 1, dtype=np.int64)
+    distances[0] = length
+    for j, letter in enumerate(ref_codes.tolist(), 1):
+        eq = peq.get(letter, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & last_bit:
+            score += 1
+        elif mh & last_bit:
+            score -= 1
+        ph = (ph << 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        distances[j] = score
+    return distances
+
+
+def find_best_matches(queries, ref, metric=None, workers=-1, chunk_size=None):
+    """Find the best matches of many sequences (e.g. primers or barcodes) in a
+    reference, comparing each query with each window of ref of the same length
+    (see `find_best_match()`).
+
+    The windows of ref are made once for each query length, and all queries of
+    that length are scored together, by chunks of windows.
+
+    Return a NumPy structured array with the fields "query", "distance" (the
+    shortest distance) and "locations" (list of (start, end) of the best matches),
+    in the order of the queries.
+
+    Parameters
+    ----------
+
+    queries
+      List of strings (or EncodedSeqs), not longer than ref.
+
+    ref
+      A string (or EncodedSeq).
+
+    metric
+      "levenshtein" (requires the rapidfuzz package, the queries are scored with
+      `rapidfuzz.process.cdist()`) or "hamming" (NumPy comparison of the ASCII
+      codes). If None, use "levenshtein" if rapidfuzz is installed, else "hamming".
+
+    workers
+      Number of threads used by `rapidfuzz.process.cdist()` (-1: all CPUs).
+
+    chunk_size
+      Number of windows scored at once (only the windows of a chunk are made).
+      If None, about 2^22 / (number of queries + query length).
+    """
+    if metric is None:
+        metric = "levenshtein" if _has_rapidfuzz else "hamming"
+    if metric not in ["levenshtein", "hamming"]:
+        raise ValueError("metric must be 'levenshtein' or 'hamming'")
+    if metric == "levenshtein" and not _has_rapidfuzz:
+        raise ImportError("The levenshtein metric requires the rapidfuzz package.")
+
+    queries = list(queries)
+    ref_codes = _get_ascii_codes(ref)
+    distances = np.zeros(len(queries), dtype=np.int64)
+    locations = np.empty(len(queries), dtype=object)
+
+    query_lengths = np.array([len(query) for query in queries], dtype=np.int64)
+    if np.any(query_lengths > len(ref_codes)):
+        raise ValueError("`ref` is shorter than a query")
+    for length in np.unique(query_lengths).tolist():
+        indices = np.flatnonzero(query_lengths == length)
+        windows = np.lib.stride_tricks.sliding_window_view(ref_codes, length)
+        if metric == "levenshtein":
+            group = [str(queries[i]) for i in indices]
+        else:
+            group = np.array([_get_ascii_codes(queries[i]) for i in indices])
+            group = group.reshape(len(indices), length)
+        size = chunk_size
+        if size is None:
+            size = max(1, 2 ** 22 // (len(indices) + length))
+        best = np.full(len(indices), length + 1, dtype=np.int64)
+        best_starts = [[] for _ in indices]
+        for start in range(0, len(windows), size):
+            if metric == "levenshtein":
+                window_strings = [  # only the windows of the chunk are decoded
+                    window.tobytes().decode("ascii")
+                    for window in windows[start : start + size]
+                ]
+                chunk_distances = rapidfuzz.process.cdist(
+                    group,
+                    window_strings,
+                    scorer=rapidfuzz.distance.Levenshtein.distance,
+                    dtype=np.int32,
+                    workers=workers,
+                )
+            else:
+                chunk = ref_codes[start : start + size + length - 1]
+                n_windows = len(chunk) - length + 1
+                chunk_distances = np.zeros((len(indices), n_windows), dtype=np.int32)
+                for k in range(length):  # one letter of all windows at a time
+                    letters = chunk[None, k : k + n_windows]
+                    chunk_distances += group[:, k, None] != letters
+            chunk_best = chunk_distances.min(axis=1)
+            for row in np.flatnonzero(chunk_best <= best).tolist():
+                starts = start + np.flatnonzero(chunk_distances[row] == chunk_best[row])
+                if chunk_best[row] < best[row]:
+                    best[row] = chunk_best[row]
+                    best_starts[row] = []
+                best_starts[row].extend(starts.tolist())
+        for row, i in enumerate(indices.tolist()):
+            distances[i] = best[row]
+            locations[i] = [(start, start + length) for start in best_starts[row]]
+
+    results = np.empty(
+        len(queries),
+        dtype=[("query", object), ("distance", np.int64), ("locations", object)],
+    )
+    results["query"] = [str(query) for query in queries]
+    results["distance"] = distances
+    results["locations"] = locations
+    return results
+
+
 def modify_seq(seq, skip_first=False, skip_last=False):
     if skip_first:
         start = 3
@@ -146,13 +746,25 @@ def modify_seq(seq, skip_first=False, skip_last=False):
 
 
 def find_longest_repeat(seq):
-    """Find the longest repeat in a string, 
+    """Find the longest repeat in a string (or EncodedSeq),
     then return the length and the character in a tuple.
     """
+    try:
+        starts, lengths, letters = find_runs(seq)
+    except UnicodeEncodeError:  # non-ASCII letters: compare them one by one
+        return _find_longest_repeat_in_letters(seq)
+    if len(lengths) == 0:
+        return (0, "")
+    longest = np.argmax(lengths)  # first of the longest runs
+    return (int(lengths[longest]), chr(letters[longest]))
+
+
+def _find_longest_repeat_in_letters(seq):
+    """Return (length, letter) of the longest repeat in any iterable of letters."""
     maximum = 0
     count = 0
-    current = ''
-    letter = ''
+    current = ""
+    letter = ""
 
     for nt in seq:
         if nt == current:
@@ -166,3 +778,84 @@ def find_longest_repeat(seq):
         maximum = max(count, maximum)
 
     return (maximum, letter)
+
+
+def find_runs(seq):
+    """Run-length encode a string (or EncodedSeq).
+
+    Return a tuple of arrays (starts, lengths, letters) of the runs (homopolymers)
+    of the sequence, in order. The letters are ASCII codes (use `chr()`).
+    """
+    codes = _get_ascii_codes(seq)
+    if len(codes) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return (empty, empty, np.zeros(0, dtype=np.uint8))
+    starts = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    starts = np.concatenate([[0], starts])
+    lengths = np.diff(np.concatenate([starts, [len(codes)]]))
+    return (starts, lengths, codes[starts])
+
+
+def find_long_runs(seq, min_length):
+    """Return the runs (starts, lengths, letters) of a string (or EncodedSeq) of
+    at least min_length letters (see `find_runs()`)."""
+    starts, lengths, letters = find_runs(seq)
+    selected = lengths >= min_length
+    return (starts[selected], lengths[selected], letters[selected])
+
+
+def find_longest_run_per_letter(seq):
+    """Return a dictionary of the longest run of each letter of a string (or
+    EncodedSeq), as letter: (length, start) (the first of the longest runs)."""
+    starts, lengths, letters = find_runs(seq)
+    # Sort by letter, then by decreasing length, then by start:
+    order = np.lexsort((starts, -lengths, letters))
+    firsts = order[np.flatnonzero(np.diff(letters[order], prepend=-1) != 0)]
+    return {
+        chr(letter): (length, start)
+        for letter, length, start in zip(
+            letters[firsts].tolist(), lengths[firsts].tolist(), starts[firsts].tolist()
+        )
+    }
+
+
+def find_longest_run_per_window(seq, window_size, step=1):
+    """Return the array of the length of the longest run (homopolymer) within each
+    window of a string (or EncodedSeq), for windows starting at 0, step, 2*step...
+
+    Runs crossing the edges of a window are counted within the window only.
+    """
+    starts, lengths, letters = find_runs(seq)
+    sequence_length = int(np.sum(lengths))
+    if window_size > sequence_length:
+        raise ValueError("`window_size` is longer than the sequence")
+    window_starts = np.arange(0, sequence_length - window_size + 1, step)
+    window_ends = window_starts + window_size
+    run_ends = starts + lengths
+    run_ids = np.repeat(np.arange(len(lengths)), lengths)  # run of each position
+    first = run_ids[window_starts]
+    last = run_ids[window_ends - 1]
+
+    # Runs at the edges, clipped to the windows:
+    longest = np.maximum(run_ends[first] - window_starts, window_ends - starts[last])
+    longest = np.minimum(longest, window_size)
+    # Runs between the edges: range maximum (sparse table) over runs first+1..last-1
+    n_inner = last - first - 1
+    inner = n_inner > 0
+    if np.any(inner):
+        tables = [lengths]
+        while 2 ** len(tables) <= n_inner.max():
+            previous = tables[-1]
+            half = 2 ** (len(tables) - 1)
+            tables.append(np.maximum(previous[:-half], previous[half:]))
+        levels = np.log2(np.maximum(n_inner, 1)).astype(np.int64)
+        inner_longest = np.zeros(len(window_starts), dtype=np.int64)
+        for level, table in enumerate(tables):
+            selected = np.flatnonzero(inner & (levels == level))
+            range_starts = first[selected] + 1
+            range_ends = last[selected] - 2 ** level  # start of the second half
+            inner_longest[selected] = np.maximum(
+                table[range_starts], table[range_ends]
+            )
+        longest = np.maximum(longest, inner_longest)
+    return longest